@@ -1,27 +1,149 @@
-from typing import DefaultDict
-from collections import defaultdict
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from enumerations import ExchangeState
+from scheduling import schedule_once, cancel_tasks
+import config
+
+class ExchangeSession:
+    """Exchange of cards in progress in a game"""
+    __slots__ = ("game_id", "state", "player1", "player2", "invited", "expires_at")
+
+    def __init__(self, game_id: int, player1: dict, invited: Optional[int], expires_at: float) -> None:
+        self.game_id = game_id
+        self.state = ExchangeState.INVITED
+        #{"player": id, "card": id} of each side
+        self.player1 = player1
+        self.player2: dict = {}
+        self.invited = invited
+        self.expires_at = expires_at
 
 class CollaborationManager:
-    """Class to hold data between different endpoints"""
+    """Class to hold data between different endpoints.
+    Keeps at most one exchange per game, it expires after its ttl and the least recently used are evicted past the cap"""
+
+    def __init__(self, ttl: float = config.exchange_ttl, max_sessions: int = config.max_exchange_sessions,
+                 clock: Callable[[], float] = time.monotonic,
+                 on_expire: Optional[Callable[[ExchangeSession], None]] = None) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.on_expire = on_expire
+        #Game id -> open exchange, from least to most recently used
+        self.sessions: OrderedDict[int, ExchangeSession] = OrderedDict()
+        #(expires_at, seq, session) of every open exchange, the scheduler sleeps until the first one
+        self.deadlines: list[tuple[float, int, ExchangeSession]] = []
+        self._seq = itertools.count()
+        #Loop where the scheduler runs, set by start
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
 
-    def __init__(self) -> None:
-        self.collaboration_data: DefaultDict[int, tuple[dict, dict]] = defaultdict(lambda: ({}, {}))
+    def start(self) -> None:
+        """Expires the exchanges from the running loop until stop is called"""
+        self.loop = asyncio.get_running_loop()
+        if self.deadlines:
+            self._schedule(False)
+
+    async def stop(self) -> None:
+        self.loop = None
+        await cancel_tasks(self._task)
+        self._task = None
 
     def init_buffer(self, game_id: int) -> None:
-        self.collaboration_data[game_id] = ({}, {})
+        self.remove_game(game_id)
 
-    def add_first_collaboration(self, game_id: int, data: dict) -> None:
-        self.collaboration_data[game_id]["player1"] = data
+    def add_first_collaboration(self, game_id: int, data: dict, invited: Optional[int] = None,
+                                ttl: Optional[float] = None) -> ExchangeSession:
+        """Opens an exchange, it replaces the previous one of the game"""
+        self.remove_game(game_id)
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        session = ExchangeSession(game_id, data, invited, expires_at)
+        self.sessions[game_id] = session
+        while len(self.sessions) > self.max_sessions:
+            _, evicted = self.sessions.popitem(last=False)
+            evicted.state = ExchangeState.EXPIRED
+        self._push(session)
+        return session
 
     def add_second_collaboration(self, game_id: int, data: dict) -> None:
-        self.collaboration_data[game_id]["player2"] = data
+        session = self.get_session(game_id)
+        if session is not None:
+            session.player2 = data
+            session.state = ExchangeState.ACCEPTED
+
+    def get_session(self, game_id: int) -> Optional[ExchangeSession]:
+        """Returns the open exchange of the game, None if there is none or it expired"""
+        self.expire()
+        session = self.sessions.get(game_id)
+        if session is not None:
+            self.sessions.move_to_end(game_id)
+        return session
+
+    def get_just_p1_data(self, game_id: int) -> Optional[dict]:
+        """Resolves the exchange of the game, returns the data of who started it"""
+        session = self._resolve(game_id)
+        return session.player1 if session is not None else None
+
+    def get_data(self, game_id: int) -> Optional[tuple[dict, dict]]:
+        session = self._resolve(game_id)
+        return (session.player1, session.player2) if session is not None else None
+
+    def remove_game(self, game_id: int) -> None:
+        """Forgets the exchange of a game that finished or was left"""
+        session = self.sessions.pop(game_id, None)
+        if session is not None:
+            session.state = ExchangeState.RESOLVED
+
+    def remove_player(self, game_id: int, player_id: int) -> None:
+        """Forgets the exchange of the game if the player was part of it"""
+        session = self.sessions.get(game_id)
+        if session is not None and player_id in (session.player1.get("player"), session.invited):
+            self.remove_game(game_id)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Expires the exchanges whose ttl ran out, returns how many"""
+        now = self.clock() if now is None else now
+        expired = 0
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, _, session = heapq.heappop(self.deadlines)
+            if self.sessions.get(session.game_id) is session:
+                del self.sessions[session.game_id]
+                session.state = ExchangeState.EXPIRED
+                expired += 1
+                if self.on_expire is not None:
+                    self.on_expire(session)
+        return expired
+
+    def _resolve(self, game_id: int) -> Optional[ExchangeSession]:
+        session = self.get_session(game_id)
+        if session is not None:
+            del self.sessions[game_id]
+            session.state = ExchangeState.RESOLVED
+        return session
+
+    def _push(self, session: ExchangeSession) -> None:
+        first = self.deadlines[0][0] if self.deadlines else None
+        heapq.heappush(self.deadlines, (session.expires_at, next(self._seq), session))
+        if len(self.deadlines) > 2 * self.max_sessions:
+            #Drop the deadlines of exchanges already resolved
+            self.deadlines = [d for d in self.deadlines if self.sessions.get(d[2].game_id) is d[2]]
+            heapq.heapify(self.deadlines)
+        self._schedule(first is not None and session.expires_at < first)
 
-    def get_just_p1_data(self, game_id: int) -> dict:
-        data = self.collaboration_data[game_id]["player1"]
-        self.collaboration_data[game_id] = ({}, {})
-        return data
+    def _schedule(self, earlier: bool) -> None:
+        if earlier and self._task is not None and not self._task.done():
+            #The scheduler sleeps past the new deadline
+            self._task.cancel()
+            self._task = None
+        #Until it is started the exchanges expire when they are looked up
+        self._task = schedule_once(self.loop, self._task, self._expire_later)
 
-    def get_data(self, game_id: int) -> tuple[dict, dict]:
-        data = self.collaboration_data[game_id]
-        self.collaboration_data[game_id] = ({}, {})
-        return data
\ No newline at end of file
+    async def _expire_later(self) -> None:
+        while self.deadlines:
+            delay = self.deadlines[0][0] - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.expire()
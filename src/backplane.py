@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Callable, DefaultDict, List
+
+Handler = Callable[[Any], None]
+
+class Backplane(ABC):
+    """Publishes messages to the subscribers of a channel.
+    The server runs a single worker on purpose: the games, the lobby, the exchanges and the tokens live in its memory.
+    Sharing them between processes needs a backplane between workers and the requests of a game routed to its owner"""
+
+    def __init__(self) -> None:
+        self.handlers: DefaultDict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self.handlers[channel].append(handler)
+
+    @abstractmethod
+    def publish(self, channel: str, data: Any) -> None:
+        """Calls the subscribers of the channel"""
+
+    async def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _deliver(self, channel: str, data: Any) -> None:
+        for handler in self.handlers.get(channel, ()):
+            handler(data)
+
+class InProcessBackplane(Backplane):
+    """Backplane of the worker, it calls the subscribers right away"""
+
+    def publish(self, channel: str, data: Any) -> None:
+        self._deliver(channel, data)
@@ -0,0 +1,52 @@
+from array import array
+from functools import lru_cache
+from typing import Tuple
+from enumerations import CardName, Kind
+
+kind_list = [Kind.THETHING, Kind.INFECTION, Kind.ACTION, Kind.ACTION, Kind.ACTION, 
+             Kind.ACTION, Kind.ACTION, Kind.ACTION, Kind.ACTION, Kind.ACTION, 
+             Kind.OBSTACLE, Kind.ACTION, Kind.DEFENSE, Kind.DEFENSE, Kind.DEFENSE, 
+             Kind.DEFENSE, Kind.DEFENSE, Kind.OBSTACLE, Kind.PANIC, Kind.PANIC, 
+             Kind.PANIC, Kind.PANIC, Kind.PANIC, Kind.PANIC, Kind.PANIC, 
+             Kind.PANIC, Kind.PANIC, Kind.PANIC, Kind.PANIC, Kind.PANIC]
+
+def get_card_deck(num_of_players : int):
+    """Returns the list of the amount of each card given the number of players"""
+    card_deck_mapping = {
+        4: [1, 8, 3, 0, 1, 4, 4, 1, 2, 1, 2, 1, 2, 1, 0, 1, 1, 1, 0, 0, 0, 0, 1, 0, 1, 0, 0, 1, 0, 1, 0],
+        5: [1, 8, 3, 1, 1, 4, 4, 1, 2, 1, 2, 1, 2, 1, 1, 1, 1, 1, 1, 0, 0, 1, 1, 1, 1, 1, 0, 1, 0, 1, 0],
+        6: [1, 10, 3, 2, 1, 4, 5, 2, 2, 1, 3, 1, 2, 2, 2, 2, 2, 2, 1, 1, 0, 1, 1, 1, 1, 1, 0, 1, 0, 1, 0],
+        7: [1, 12, 3, 2, 1, 5, 5, 2, 3, 1, 4, 2, 3, 2, 2, 2, 2, 2, 1, 1, 1, 2, 2, 2, 2, 2, 1, 2, 1, 1, 0],
+        8: [1, 13, 3, 2, 1, 6, 5, 2, 3, 1, 5, 2, 3, 2, 3, 3, 2, 2, 1, 2, 1, 2, 2, 2, 2, 2, 1, 2, 1, 1, 0],
+        9: [1, 15, 4, 3, 2, 7, 6, 2, 4, 2, 5, 2, 4, 2, 3, 3, 2, 2, 2, 2, 1, 2, 3, 3, 3, 3, 2, 3, 2, 2, 0],
+        10: [1, 17, 4, 3, 2, 8, 7, 3, 4, 2, 6, 2, 4, 2, 3, 3, 2, 2, 2, 2, 1, 2, 3, 3, 3, 3, 2, 3, 2, 2, 1],
+        11: [1, 20, 5, 3, 2, 8, 7, 3, 5, 2, 7, 3, 5, 3, 4, 4, 3, 3, 2, 2, 1, 2, 3, 3, 3, 3, 2, 3, 2, 2, 1],
+        12: [1, 20, 5, 3, 2, 8, 7, 3, 5, 2, 7, 3, 5, 3, 4, 4, 3, 3, 2, 2, 1, 2, 3, 3, 3, 3, 2, 3, 2, 2, 1]
+    }
+    
+    return card_deck_mapping[num_of_players]
+
+class CardType:
+    """Immutable card of the catalog, shared by every game"""
+    __slots__ = ("code", "name", "kind", "description")
+
+    def __init__(self, code: int, name: CardName, kind: Kind, description: str = "description") -> None:
+        self.code = code
+        self.name = name
+        self.kind = kind
+        self.description = description
+
+#Built once at import, the position of a card type is its code
+CATALOG: Tuple[CardType, ...] = tuple(
+    CardType(code, name, kind) for code, (name, kind) in enumerate(zip(CardName, kind_list))
+)
+
+CODES = {card.name: card.code for card in CATALOG}
+
+@lru_cache(maxsize=None)
+def deck_manifest(num_of_players: int) -> bytes:
+    """Returns the catalog code of every physical card of a game, the index of a card is its id in the game"""
+    manifest = array("B")
+    for card, cantidad in zip(CATALOG, get_card_deck(num_of_players)):
+        manifest.extend([card.code] * cantidad)
+    return manifest.tobytes()
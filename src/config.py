@@ -1,2 +1,11 @@
 database = "sqlite"
-databasename = "app.sqlite"
\ No newline at end of file
+databasename = "app.sqlite"
+outbound_queue_size = 64
+slow_consumer_policy = "drop_oldest"
+lobby_broadcast_window = 0.1
+db_workers = 4
+#Seconds an exchange invitation waits for an answer and how many open exchanges are kept
+exchange_ttl = 60.0
+max_exchange_sessions = 1024
+#Seed of the seating and the deal of every game (mixed with its id), only for tests and load tests
+deal_seed = None
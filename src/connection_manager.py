@@ -1,84 +1,219 @@
-import json
-from typing import DefaultDict
+import asyncio
+import secrets
+from typing import Callable, DefaultDict
 from collections import defaultdict
 
 from fastapi import WebSocket
 
-from schemas import GameInDB, GameOut
+from enumerations import SlowConsumerPolicy
+from backplane import Backplane, InProcessBackplane
+from schemas import GameInDB
+import config
+
+class OutboundConnection:
+    """Bounded queue of outgoing messages and the task that writes them to a websocket"""
+
+    def __init__(self, websocket: WebSocket, maxsize: int, policy: SlowConsumerPolicy,
+                 on_close: Callable[[WebSocket], None]) -> None:
+        self.websocket = websocket
+        self.policy = policy
+        self.on_close = on_close
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.task = self.loop.create_task(self._writer())
+        self.dropped = 0
+
+    def send(self, message: str) -> None:
+        """Enqueues a message without waiting for the client"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._put(message)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message: str) -> None:
+        if self.task.done():
+            return
+        try:
+            self.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+        self.dropped += 1
+        match self.policy:
+            case SlowConsumerPolicy.DROP:
+                pass
+            case SlowConsumerPolicy.DROP_OLDEST:
+                self.queue.get_nowait()
+                self.queue.put_nowait(message)
+            case SlowConsumerPolicy.DISCONNECT:
+                self.close(reason="SLOW_CONSUMER")
+                self.on_close(self.websocket)
+
+    async def _writer(self) -> None:
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            #The client is gone, forget the connection
+            self.on_close(self.websocket)
+
+    def close(self, reason: str | None = None) -> None:
+        self.task.cancel()
+        if reason is not None:
+            self.loop.create_task(self.websocket.close(code=1008, reason=reason))
 
 class ConnectionManager:
     # General Methods
 
-    def __init__(self) -> list[(int, WebSocket)]:
-        self.active_connections: DefaultDict[int, list[WebSocket]] = defaultdict(lambda: [])
-        self.connection_players: DefaultDict[WebSocket, tuple[int, int]] = {}
+    def __init__(self, queue_size: int = config.outbound_queue_size,
+                 policy: SlowConsumerPolicy = SlowConsumerPolicy(config.slow_consumer_policy),
+                 backplane: Backplane | None = None) -> list[(int, WebSocket)]:
+        #Group id -> connections of the group (0 is the main menu group)
+        self.active_connections: DefaultDict[int, set[WebSocket]] = defaultdict(set)
+        #Connection -> group id where it currently is
+        self.connection_groups: dict[WebSocket, int] = {}
+        #Connection -> (game id, player id) and its reverse index
+        self.connection_players: dict[WebSocket, tuple[int, int]] = {}
+        self.player_connections: dict[tuple[int, int], WebSocket] = {}
+        self.outbound: dict[WebSocket, OutboundConnection] = {}
+        #Token given to each connection -> connection, and its reverse index
+        self.tokens: dict[str, WebSocket] = {}
+        self.connection_tokens: dict[WebSocket, str] = {}
+        self.queue_size = queue_size
+        self.policy = policy
+        #Broadcasts go through the backplane, the subscriber delivers them to the connections of the group
+        self.backplane = backplane if backplane is not None else InProcessBackplane()
+        self.backplane.subscribe("broadcast", lambda data: self.deliver(*data))
     
-    async def connect(self, game_id: int, websocket: WebSocket) -> None:
+    async def connect(self, game_id: int, websocket: WebSocket) -> str:
+        """Adds the connection to the group, returns the token the client uses to route it to a game"""
         await websocket.accept()
-        self.active_connections[game_id].append(websocket)
+        self.active_connections[game_id].add(websocket)
+        self.connection_groups[websocket] = game_id
+        self.outbound[websocket] = OutboundConnection(websocket, self.queue_size, self.policy, self.drop_connection)
+        token = secrets.token_urlsafe(16)
+        self.tokens[token] = websocket
+        self.connection_tokens[websocket] = token
+        return token
 
     def disconnect(self, game_id: int, websocket: WebSocket) -> None:
-        for socket in self.active_connections[game_id]:
-            if socket == websocket:
-                self.active_connections[game_id].remove(websocket)
-
-    async def get_websocket(self, game_id: int, player_id: int) -> WebSocket:
-        for conn in self.active_connections[game_id]:
-            if self.connection_players[conn] == (game_id, player_id):
-                return conn
-        raise Exception("Connection not found")
+        """Removes the connection from the group where it currently is"""
+        self.drop_connection(websocket, keep_identifier=True)
+
+    def drop_connection(self, websocket: WebSocket, keep_identifier: bool = False) -> None:
+        """Forgets a connection that failed, could not keep up or was closed"""
+        group = self.connection_groups.pop(websocket, None)
+        if group is not None:
+            self._leave_group(group, websocket)
+        if not keep_identifier:
+            self._unset_identifier(websocket)
+        token = self.connection_tokens.pop(websocket, None)
+        if token is not None:
+            del self.tokens[token]
+        outbound = self.outbound.pop(websocket, None)
+        if outbound is not None:
+            outbound.close()
+
+    def get_websocket(self, game_id: int, player_id: int) -> WebSocket:
+        conn = self.player_connections.get((game_id, player_id))
+        if conn is None:
+            raise Exception("Connection not found")
+        return conn
     
     async def set_websocket(self, game_id: int, player_id: int, websocket: WebSocket) -> None:
-        self.connection_players[websocket] = (game_id, player_id)
+        self._identify(game_id, player_id, websocket)
 
     async def delete_websocket(self, websocket: WebSocket) -> None:
-        del self.connection_players[websocket]
+        self._unset_identifier(websocket)
     
     async def send_personal_message(self, game_id: int, message: str, websocket: WebSocket) -> None:
-        for conn in self.active_connections[game_id]:
-            if conn == websocket:
-                await websocket.send_text(message)
-                break
+        if self.connection_groups.get(websocket) == game_id:
+            self.outbound[websocket].send(message)
 
     async def broadcast(self, game_id: int, message: str) -> None:
-        for conn in self.active_connections[game_id]:
-            await conn.send_text(message)
+        """Publishes the message to the group, it does not wait for delivery"""
+        self.backplane.publish("broadcast", (game_id, message))
+
+    def deliver(self, game_id: int, message: str) -> None:
+        """Enqueues the message for every connection of the group"""
+        #Slow consumers may be dropped while sending, iterate over a copy
+        for conn in tuple(self.active_connections.get(game_id, ())):
+            outbound = self.outbound.get(conn)
+            if outbound is not None:
+                outbound.send(message)
     
+    async def route(self, token: str | None, game_id: int, player_id: int) -> bool:
+        """Moves the connection with the token to the game and identifies it as the player"""
+        websocket = self.tokens.get(token) if token is not None else None
+        if websocket is None:
+            return False
+        current = self.connection_groups.get(websocket)
+        if current is not None and current != game_id:
+            self._move(current, game_id, websocket)
+        self._identify(game_id, player_id, websocket)
+        return True
+
     async def join_game(self, game_id: int, websocket: WebSocket, player_id: int) -> None:
-        self.connection_players[websocket] = (game_id, player_id)
+        await self.set_websocket(game_id, player_id, websocket)
         await self.connect(game_id, websocket)
 
-    # Methods for listing games ("/join") communication
+    async def leave_game(self, game_id: int, player_id: int) -> None:
+        """Moves the connection of a player back to the main menu group and deletes its identifier"""
+        websocket = self.player_connections.get((game_id, player_id))
+        if websocket is None:
+            return
+        if self.connection_groups.get(websocket) == game_id:
+            await self.move_connection(game_id, 0, websocket)
+        self._unset_identifier(websocket)
+
+    def _leave_group(self, game_id: int, websocket: WebSocket) -> None:
+        group = self.active_connections.get(game_id)
+        if group is not None:
+            group.discard(websocket)
+            if not group and game_id != 0:
+                del self.active_connections[game_id]
+
+    def _move(self, current_game_id: int, target_game_id: int, websocket: WebSocket) -> None:
+        self._leave_group(current_game_id, websocket)
+        self.active_connections[target_game_id].add(websocket)
+        self.connection_groups[websocket] = target_game_id
+
+    def _identify(self, game_id: int, player_id: int, websocket: WebSocket) -> None:
+        self._unset_identifier(websocket)
+        self.connection_players[websocket] = (game_id, player_id)
+        self.player_connections[(game_id, player_id)] = websocket
+
+    def _unset_identifier(self, websocket: WebSocket) -> None:
+        identifier = self.connection_players.pop(websocket, None)
+        if identifier is not None and self.player_connections.get(identifier) is websocket:
+            del self.player_connections[identifier]
 
-    async def send_games(self, games: list[GameOut]) -> None:
-        games_list_id = 0
-        games_json = json.dumps([g.__dict__ for g in games])
-        await self.broadcast(games_list_id, games_json)
-    
     # Method for lobby ("join/{game_id}")communication
 
-    async def send_lobby_info(self, game_id: int, game_info: GameInDB) -> None:
-        game_info_json = json.dumps(game_info.__dict__)
+    async def send_lobby_info(self, game_id: int, game_info: GameInDB | str) -> None:
+        """Sends the game information, it can come already serialized to share the payload"""
+        game_info_json = game_info if isinstance(game_info, str) else game_info.json()
         await self.broadcast(game_id, game_info_json)
 
     async def move_connection(self, current_game_id: int, target_game_id: int, websocket: WebSocket):
-        if current_game_id in self.active_connections and target_game_id in self.active_connections:
-            if websocket in self.active_connections[current_game_id]:
-                self.active_connections[current_game_id].remove(websocket)
-                self.active_connections[target_game_id].append(websocket)
-            else:
-                raise Exception("Connection not found in the current game")
-        else:
-            raise Exception("Invalid current or target game ID")
+        if self.connection_groups.get(websocket) != current_game_id:
+            raise Exception("Connection not found in the current game")
+        self._move(current_game_id, target_game_id, websocket)
 
     async def remove_all_connection_of_game(self, game_id: int) -> None:
-        if game_id in self.active_connections:
-            for conn in self.active_connections[game_id]:
-                await self.move_connection(game_id, 0, conn)
-                await self.delete_websocket(conn)
-            del self.active_connections[game_id]
-        else:
-            raise Exception("Invalid game ID")
+        """Moves every connection of the game back to the main menu group and deletes their identifiers"""
+        connections = self.active_connections.pop(game_id, set())
+        self.active_connections[0].update(connections)
+        for conn in connections:
+            self.connection_groups[conn] = 0
+            self._unset_identifier(conn)
 
 """ class CollaborationManager:
 
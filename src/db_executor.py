@@ -0,0 +1,47 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+from pony.orm import db_session
+import config
+
+T = TypeVar("T")
+
+class DatabaseExecutor:
+    """Runs the units of work with the database in a bounded pool of threads, so they never block the event loop.
+    Entities must not leave the unit of work, it has to return plain values or schemas"""
+
+    def __init__(self, max_workers: int = config.db_workers) -> None:
+        self.max_workers = max_workers
+        self.pool: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, unit: Callable[..., T], *args, **kwargs) -> Future:
+        """Schedules the unit of work in its own db_session"""
+        if self.pool is None:
+            #Created on the first unit, and again after a shutdown when the app is started again
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        return self.pool.submit(partial(run_in_session, unit, *args, **kwargs))
+
+    async def run(self, unit: Callable[..., T], *args, **kwargs) -> T:
+        """Runs the unit of work in its own db_session and waits for its result"""
+        return await asyncio.wrap_future(self.submit(unit, *args, **kwargs))
+
+    async def transaction(self, unit: Callable[..., T], outbox, *args) -> T:
+        """Runs a unit of work that records its effects in the outbox, they are dispatched only after the commit"""
+        try:
+            result = await self.run(unit, outbox, *args)
+        except BaseException:
+            outbox.discard()
+            raise
+        await outbox.dispatch()
+        return result
+
+    def shutdown(self) -> None:
+        """Waits for the units of work already submitted and ends the threads"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+def run_in_session(unit: Callable[..., T], *args, **kwargs) -> T:
+    with db_session:
+        return unit(*args, **kwargs)
@@ -1,20 +1,9 @@
-from pony.orm import (Database, PrimaryKey, Required, Set, Optional)
-from enumerations import (Kind, Role, CardName)
+from pony.orm import (Database, PrimaryKey, Required, Set, Optional, db_session)
+from enumerations import Role
 import config
 
 db = Database()
 
-class Card(db.Entity):
-    """Represent a Card in the database"""
-    id = PrimaryKey(int, auto=True)
-    name = Required(CardName, default=CardName.THE_THING)
-    description = Required(str, default="description")
-    kind = Required(Kind, default=Kind.ACTION)
-    game_deck = Optional('Game', reverse="deck")
-    game_discard = Optional('Game', reverse="discarded")
-    player = Optional('Player', reverse="hand")
-    required_players = Required(int, default=0)
-
 class Player(db.Entity):
     """Represent a Player in the database"""
     id = PrimaryKey(int, auto=True)
@@ -24,10 +13,10 @@ class Player(db.Entity):
     position = Required(int, default=0)
     role = Required(Role, default=Role.HUMAN)
     is_dead = Required(bool, default=False)
-    hand = Set(Card)
     in_lockdown = Required(bool, default=False)
     left_barrier = Required(bool, default=False)
     right_barrier = Required(bool, default=False)
+    hand_cards = Optional(bytes)
 
 class Game(db.Entity):
     """Represent a Game in the database"""
@@ -42,10 +31,29 @@ class Game(db.Entity):
     going_clockwise = Required(bool, default=True)
     min_players = Required(int, default=4, py_check=lambda x: x >= 4 and x <= 12)
     max_players = Required(int, default=12, py_check=lambda x: x >= 4 and x <= 12)
-    deck = Set(Card)
-    discarded = Set(Card)
     number_of_players = Required(int, default=1)
+    #Cards of a running game, see card_catalog
+    card_manifest = Optional(bytes)
+    deck_cards = Optional(bytes)
+    discarded_cards = Optional(bytes)
+
+#Columns added to tables that databases of older versions already have
+ADDED_COLUMNS = {
+    "Game": ("card_manifest", "deck_cards", "discarded_cards"),
+    "Player": ("hand_cards",),
+}
 
+def migrate(database: Database) -> None:
+    """Adds the missing columns to the tables of an older database, Pony only creates whole tables"""
+    if database.provider_name != "sqlite":
+        return
+    with db_session:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row[1] for row in database.execute(f'PRAGMA table_info("{table}")')}
+            for column in columns:
+                if existing and column not in existing:
+                    database.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" BLOB')
 
 db.bind(config.database, config.databasename, create_db=True)
-db.generate_mapping(create_tables=True)
\ No newline at end of file
+migrate(db)
+db.generate_mapping(create_tables=True)
@@ -53,3 +53,14 @@ class CardName(str, Enum):
     WHY_NOT_BE_FRIENDS = 'No podemos ser amigos?'
     BLIND_DATE = 'Cita a ciegas'
     UPS = 'Ups!'
+
+class SlowConsumerPolicy(str, Enum):
+    DROP = "drop"
+    DROP_OLDEST = "drop_oldest"
+    DISCONNECT = "disconnect"
+
+class ExchangeState(str, Enum):
+    INVITED = "invited"
+    ACCEPTED = "accepted"
+    RESOLVED = "resolved"
+    EXPIRED = "expired"
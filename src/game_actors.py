@@ -0,0 +1,75 @@
+import asyncio
+import functools
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from scheduling import schedule_once, cancel_tasks
+
+T = TypeVar("T")
+
+class GameActors:
+    """Runs the actions of each game one after another in its mailbox, different games run concurrently"""
+
+    def __init__(self) -> None:
+        self.mailboxes: Dict[int, Deque[tuple[Callable[[], Awaitable[Any]], asyncio.Future]]] = {}
+        self.workers: Dict[int, asyncio.Task] = {}
+        #Loop where the mailboxes are drained, set by start
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Drains the mailboxes in the running loop until stop is called"""
+        self.loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        """Cancels the actions still queued or running"""
+        self.loop = None
+        for mailbox in self.mailboxes.values():
+            for _, future in mailbox:
+                future.cancel()
+        workers = list(self.workers.values())
+        self.mailboxes.clear()
+        self.workers.clear()
+        await cancel_tasks(*workers)
+
+    async def submit(self, game_id: int, action: Callable[[], Awaitable[T]]) -> T:
+        """Queues the action in the mailbox of the game and waits for its result"""
+        if self.loop is None:
+            raise RuntimeError("The game actors are not started")
+        future = self.loop.create_future()
+        worker = self.workers.get(game_id)
+        if worker is None or worker.done():
+            self.mailboxes[game_id] = deque()
+        mailbox = self.mailboxes[game_id]
+        mailbox.append((action, future))
+        self.workers[game_id] = schedule_once(self.loop, worker, lambda: self._drain(game_id, mailbox))
+        return await future
+
+    def serialize(self, key: str = "id_game"):
+        """Decorator for the endpoints that change a game, the key is the name of the game id parameter"""
+        def decorator(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                return await self.submit(kwargs[key], lambda: endpoint(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    async def _drain(self, game_id: int, mailbox: Deque) -> None:
+        while mailbox:
+            action, future = mailbox.popleft()
+            if future.done():
+                #The request was cancelled before its turn
+                continue
+            try:
+                result = await action()
+            except asyncio.CancelledError:
+                #Stopped while the action was running
+                future.cancel()
+                raise
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if not future.done():
+                    future.set_result(result)
+        if self.mailboxes.get(game_id) is mailbox:
+            del self.mailboxes[game_id]
+            del self.workers[game_id]
@@ -0,0 +1,111 @@
+"""Rules of a running game over its in-memory state, they never touch the database"""
+from array import array
+from fastapi import HTTPException
+from game_state import GameState, SeatState
+from card_catalog import deck_manifest
+from schemas import PlayerId
+from enumerations import CardName, Kind, Role
+
+def create_deck(game: GameState) -> None:
+    """Creates a deck given an amount of players"""
+    game.manifest = deck_manifest(game.number_of_players)
+    game.deck = array("B", range(len(game.manifest)))
+    del game.discarded[:]
+
+def reshuffle_discarded(game: GameState) -> None:
+    """Turns the discard pile into the new shuffled deck"""
+    game.deck, game.discarded = game.discarded, array("B")
+    game.rng.shuffle(game.deck)
+
+def draw_card(game: GameState, player: SeatState) -> int:
+    """Draws a card to the given player"""
+    #The deck is kept shuffled, its top is the last card
+    if not game.deck:
+        reshuffle_discarded(game)
+    card = game.deck.pop()
+    player.hand.append(card)
+    return card
+
+def deal_cards(game: GameState) -> None:
+    """Deals four cards to each player and gives La Cosa to one of them"""
+    rng = game.rng
+    eligible_kinds = {Kind.ACTION, Kind.DEFENSE}
+    eligible, rest = array("B"), array("B")
+    card_theThing = None
+
+    #Partition the deck once by what can be dealt
+    for card in game.deck:
+        card_type = game.card(card)
+        if card_type.name == CardName.THE_THING:
+            card_theThing = card
+        elif card_type.kind in eligible_kinds:
+            eligible.append(card)
+        else:
+            rest.append(card)
+
+    rng.shuffle(eligible)
+    seats = list(game.seats())
+    for num, player in enumerate(seats):
+        player.hand = eligible[4 * num:4 * (num + 1)]
+    rest.extend(eligible[4 * len(seats):])
+
+    if seats:
+        theThingPlayer = rng.choice(seats)
+        replaced = rng.randrange(len(theThingPlayer.hand))
+        rest.append(theThingPlayer.hand[replaced])
+        theThingPlayer.hand[replaced] = card_theThing
+        theThingPlayer.role = Role.THING
+    elif card_theThing is not None:
+        rest.append(card_theThing)
+
+    rng.shuffle(rest)
+    game.deck = rest
+    game.count_roles()
+
+def discard_card(game: GameState, player: SeatState, card: int) -> None:
+    """Discards a card from the player's hand"""
+
+    player.hand.remove(card)
+    game.discarded.append(card)
+
+def exchange_card(game: GameState, player1: SeatState, player2: SeatState, cardp1: int, cardp2: int) -> None:
+    """Exchanges a card from player1 to player2"""
+    name1 = game.card(cardp1).name
+    name2 = game.card(cardp2).name
+
+    if (name1 == CardName.INFECTED and player1.role != Role.THING) or (name2 == CardName.INFECTED and player2.role != Role.THING):
+        raise HTTPException(status_code=404, detail="INVALID_EXCHANGE")
+    elif (name1 == CardName.INFECTED and player1.role == Role.THING and player2.role == Role.HUMAN):
+        game.set_role(player2, Role.INFECTED)
+    elif (name2 == CardName.INFECTED and player2.role == Role.THING and player1.role == Role.HUMAN):
+        game.set_role(player1, Role.INFECTED)
+
+    player1.hand.remove(cardp1)
+    player2.hand.remove(cardp2)
+    player1.hand.append(cardp2)
+    player2.hand.append(cardp1)
+
+def change_turn(game: GameState) -> int:
+    """Changes the turn of the game to the next living player in the playing direction"""
+    game.current_turn = game.seat_ring().next_from(game.current_turn, game.going_clockwise).position
+    return game.current_turn
+
+def next_turn_player_name(game: GameState) -> str:
+    """Returns the name of the next turn player"""
+    return game.seat_ring().next_from(game.current_turn, game.going_clockwise).name
+
+def get_winners(game: GameState) -> dict:
+    """Returns the winners of the game, the role counters decide the outcome"""
+    if game.humans_alive or not game.thing_alive:
+        message, roles = "Humans Win", (Role.HUMAN,)
+    elif not game.infected_alive:
+        message, roles = "Just the Thing Win", (Role.THING,)
+    else:
+        message, roles = "The Thing and Infecteds Win", (Role.THING, Role.INFECTED)
+    winners = [p for p in game.seats() if not p.is_dead and p.role in roles]
+    return {"message" : message,
+        "winners" : [PlayerId(id=p.id) for p in winners]}
+
+def is_game_over(game: GameState) -> bool:
+    """Returns if the game is over, it only reads the role counters"""
+    return game.is_over()
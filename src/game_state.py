@@ -0,0 +1,368 @@
+import asyncio
+import random
+from array import array
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+from fastapi import HTTPException
+from enumerations import Role
+from card_catalog import CATALOG, CardType
+
+class SeatState:
+    """Player seated in a running game, the lockdown and barrier flags change through GameState"""
+    __slots__ = ("id", "name", "position", "role", "is_dead", "hand",
+                 "in_lockdown", "left_barrier", "right_barrier")
+
+    def __init__(self, id: int, name: str, position: int = 0, role: Role = Role.HUMAN) -> None:
+        self.id = id
+        self.name = name
+        self.position = position
+        self.role = role
+        self.is_dead = False
+        #Ids of the cards in the game, see GameState.manifest
+        self.hand = array("B")
+        self.in_lockdown = False
+        self.left_barrier = False
+        self.right_barrier = False
+
+class SeatRing:
+    """Living seats of a game, rebuilt only when seats are swapped.
+    Their flags are packed as bitmasks where bit i is the seat at position i, dead seats keep
+    their position and are skipped. Clockwise goes to the next position, the right side of a seat"""
+    __slots__ = ("by_position", "alive", "lockdown", "left_barrier", "right_barrier")
+
+    def __init__(self, players: Dict[int, SeatState]) -> None:
+        self.by_position = {s.position: s for s in players.values() if not s.is_dead}
+        self.alive = 0
+        self.lockdown = 0
+        self.left_barrier = 0
+        self.right_barrier = 0
+        for seat in self.by_position.values():
+            self.alive |= 1 << seat.position
+            self.set_flags(seat)
+
+    def __len__(self) -> int:
+        return self.alive.bit_count()
+
+    @property
+    def seats(self) -> List[SeatState]:
+        """Living seats ordered by position"""
+        return self.seats_in(self.alive)
+
+    def remove(self, seat: SeatState) -> None:
+        """Takes out a seat whose player died, the other seats do not move"""
+        bit = 1 << seat.position
+        if self.alive & bit and self.by_position.get(seat.position) is seat:
+            del self.by_position[seat.position]
+            self.alive &= ~bit
+            self.lockdown &= ~bit
+            self.left_barrier &= ~bit
+            self.right_barrier &= ~bit
+
+    def set_flags(self, seat: SeatState) -> None:
+        """Copies the lockdown and barrier flags of a living seat into the masks"""
+        bit = 1 << seat.position
+        self.lockdown = self.lockdown | bit if seat.in_lockdown else self.lockdown & ~bit
+        self.left_barrier = self.left_barrier | bit if seat.left_barrier else self.left_barrier & ~bit
+        self.right_barrier = self.right_barrier | bit if seat.right_barrier else self.right_barrier & ~bit
+
+    def at(self, position: int) -> Optional[SeatState]:
+        return self.by_position.get(position)
+
+    def next_from(self, position: int, clockwise: bool = True) -> Optional[SeatState]:
+        """Returns the first living seat after the position, it may be empty or dead"""
+        if not self.alive:
+            return None
+        if clockwise:
+            mask = (self.alive >> (position + 1) << (position + 1)) or self.alive
+            return self.by_position[(mask & -mask).bit_length() - 1]
+        mask = (self.alive & ((1 << position) - 1)) or self.alive
+        return self.by_position[mask.bit_length() - 1]
+
+    def neighbour(self, seat: SeatState, clockwise: bool = True) -> Optional[SeatState]:
+        return self.next_from(seat.position, clockwise)
+
+    def neighbours_mask(self, seat: SeatState) -> int:
+        """Living seats at both sides of the seat"""
+        if not self.alive:
+            return 0
+        left, right = self.neighbour(seat, False), self.neighbour(seat, True)
+        return ((1 << left.position) | (1 << right.position)) & ~(1 << seat.position)
+
+    def reachable_mask(self, seat: SeatState) -> int:
+        """Neighbours of the seat that are not in lockdown nor behind a barrier"""
+        mask = 0
+        right, left = self.neighbour(seat, True), self.neighbour(seat, False)
+        if right is not None and not self.blocked(seat, right):
+            mask |= 1 << right.position
+        if left is not None and not self.blocked(seat, left):
+            mask |= 1 << left.position
+        return mask & ~self.lockdown & ~(1 << seat.position)
+
+    def blocked(self, seat: SeatState, other: SeatState) -> bool:
+        """Returns if there is a barrier between two adjacent seats"""
+        if self.neighbour(seat, True) is other and ((self.right_barrier >> seat.position | self.left_barrier >> other.position) & 1):
+            return True
+        if self.neighbour(seat, False) is other and ((self.left_barrier >> seat.position | self.right_barrier >> other.position) & 1):
+            return True
+        return False
+
+    def seats_in(self, mask: int) -> List[SeatState]:
+        """Seats of the bits set in the mask, ordered by position"""
+        seats = []
+        while mask:
+            low = mask & -mask
+            seats.append(self.by_position[low.bit_length() - 1])
+            mask ^= low
+        return seats
+
+    def neighbours(self, seat: SeatState) -> List[SeatState]:
+        return self.seats_in(self.neighbours_mask(seat))
+
+    def reachable(self, seat: SeatState) -> List[SeatState]:
+        return self.seats_in(self.reachable_mask(seat))
+
+class GameState:
+    """Authoritative state of a running game, the database is only updated by the persister"""
+    __slots__ = ("id", "name", "host", "current_turn", "in_game", "is_done", "password",
+                 "going_clockwise", "min_players", "max_players", "number_of_players",
+                 "players", "deck", "discarded", "manifest", "rng", "version", "encoded",
+                 "view", "delta", "ring", "humans_alive", "infected_alive", "thing_alive")
+
+    def __init__(self, id: int, name: str, host: int) -> None:
+        self.id = id
+        self.name = name
+        self.host = host
+        self.current_turn = 0
+        self.in_game = True
+        self.is_done = False
+        self.password = ""
+        self.going_clockwise = True
+        self.min_players = 4
+        self.max_players = 12
+        self.number_of_players = 0
+        self.players: Dict[int, SeatState] = {}
+        #Catalog code of each card of the game, indexed by the card id
+        self.manifest = b""
+        self.deck = array("B")
+        self.discarded = array("B")
+        #Source of randomness of the game, seeded to reproduce a game
+        self.rng = random.Random()
+        self.version = 0
+        #(version, json) of the last serialized snapshot
+        self.encoded: Optional[tuple[int, str]] = None
+        #Base of the next state delta and the (version, json) of the last one
+        self.view = None
+        self.delta: Optional[tuple[int, str]] = None
+        #Cached SeatRing, see seat_ring
+        self.ring: Optional[SeatRing] = None
+        #Living players of each role, kept up to date by set_role and eliminate
+        self.humans_alive = 0
+        self.infected_alive = 0
+        self.thing_alive = 0
+
+    def card(self, card_id: int) -> CardType:
+        """Returns the catalog card of the given card id"""
+        return CATALOG[self.manifest[card_id]]
+
+    def seats(self) -> Iterator[SeatState]:
+        """Iterates the seats ordered by position"""
+        return iter(sorted(self.players.values(), key=lambda s: s.position))
+
+    def seat_at(self, position: int) -> Optional[SeatState]:
+        """Returns the seat at the given position"""
+        seat = self.seat_ring().at(position)
+        if seat is None:
+            seat = next((s for s in self.players.values() if s.position == position), None)
+        return seat
+
+    def seat_ring(self) -> SeatRing:
+        if self.ring is None:
+            self.ring = SeatRing(self.players)
+        return self.ring
+
+    def seating_changed(self) -> None:
+        """Must be called after positions change"""
+        self.ring = None
+
+    def eliminate(self, seat: SeatState) -> None:
+        """Marks the player as dead, its seat keeps the position and is skipped from then on"""
+        if not seat.is_dead:
+            self._count(seat.role, -1)
+        seat.is_dead = True
+        if self.ring is not None:
+            self.ring.remove(seat)
+
+    def set_role(self, seat: SeatState, role: Role) -> None:
+        if not seat.is_dead:
+            self._count(seat.role, -1)
+            self._count(role, 1)
+        seat.role = role
+
+    def count_roles(self) -> None:
+        """Counts the living players of each role from scratch, when the state is built or dealt"""
+        self.humans_alive = self.infected_alive = self.thing_alive = 0
+        for seat in self.players.values():
+            if not seat.is_dead:
+                self._count(seat.role, 1)
+
+    def is_over(self) -> bool:
+        """The game ends when the Thing dies or there are no humans left"""
+        return self.thing_alive == 0 or self.humans_alive == 0
+
+    def _count(self, role: Role, delta: int) -> None:
+        if role == Role.HUMAN:
+            self.humans_alive += delta
+        elif role == Role.INFECTED:
+            self.infected_alive += delta
+        else:
+            self.thing_alive += delta
+
+    def set_lockdown(self, seat: SeatState, value: bool) -> None:
+        seat.in_lockdown = value
+        self._flags_changed(seat)
+
+    def set_barriers(self, seat: SeatState, left: Optional[bool] = None, right: Optional[bool] = None) -> None:
+        if left is not None:
+            seat.left_barrier = left
+        if right is not None:
+            seat.right_barrier = right
+        self._flags_changed(seat)
+
+    def _flags_changed(self, seat: SeatState) -> None:
+        if self.ring is not None and not seat.is_dead:
+            self.ring.set_flags(seat)
+
+def freeze_seat(seat: SeatState) -> SeatState:
+    frozen = SeatState(seat.id, seat.name)
+    for slot in SeatState.__slots__:
+        setattr(frozen, slot, getattr(seat, slot))
+    frozen.hand = tuple(seat.hand)
+    return frozen
+
+def freeze_game_state(state: GameState) -> GameState:
+    """Read only copy of a game, it is never modified after being published"""
+    frozen = GameState(state.id, state.name, state.host)
+    for slot in GameState.__slots__:
+        setattr(frozen, slot, getattr(state, slot))
+    frozen.players = {player_id: freeze_seat(seat) for player_id, seat in state.players.items()}
+    frozen.deck = tuple(state.deck)
+    frozen.discarded = tuple(state.discarded)
+    frozen.encoded = None
+    frozen.view = None
+    frozen.delta = None
+    frozen.ring = None
+    return frozen
+
+class GameStore:
+    """Registry of the games currently running in memory"""
+
+    def __init__(self, loader: Optional[Callable[[int], Awaitable[Optional[GameState]]]] = None) -> None:
+        #Reads a running game that is not in memory, off the event loop (see loaders.read_game_state)
+        self.loader = loader
+        self.games: Dict[int, GameState] = {}
+        #Last published snapshot of each game, the read endpoints only use these
+        self.snapshots: Dict[int, GameState] = {}
+        self.player_games: Dict[int, int] = {}
+        #Reads in flight of games missing from memory, evicting a game drops its read so the result is thrown away
+        self.reads: Dict[int, asyncio.Future] = {}
+        self.persister = None
+
+    def register(self, state: GameState) -> GameState:
+        self.games[state.id] = state
+        for player_id in state.players:
+            self.player_games[player_id] = state.id
+        self.snapshots[state.id] = freeze_game_state(state)
+        return state
+
+    def get(self, game_id: int) -> Optional[GameState]:
+        """Returns the state of a running game if it is in memory"""
+        return self.games.get(game_id)
+
+    async def load(self, game_id: int) -> Optional[GameState]:
+        """Returns the state of a running game, it is read with the loader when it is not in memory.
+        Concurrent loads share one read, a read that was running when the game was evicted is read again"""
+        while True:
+            state = self.games.get(game_id)
+            if state is not None or self.loader is None:
+                return state
+            read = self.reads.get(game_id)
+            if read is None:
+                read = self.reads[game_id] = asyncio.ensure_future(self.loader(game_id))
+                read.add_done_callback(lambda done: self._loaded(game_id, done))
+            loaded = await asyncio.shield(read)
+            if loaded is None or game_id in self.games:
+                return self.games.get(game_id)
+
+    def _loaded(self, game_id: int, read: asyncio.Future) -> None:
+        #Runs before the loads waiting for the read are resumed
+        if self.reads.get(game_id) is not read:
+            return
+        del self.reads[game_id]
+        if not read.cancelled() and read.exception() is None and read.result() is not None:
+            if game_id not in self.games:
+                self.register(read.result())
+
+    def get_by_player(self, player_id: int) -> Optional[GameState]:
+        game_id = self.player_games.get(player_id)
+        return self.games.get(game_id) if game_id is not None else None
+
+    def snapshot(self, game_id: int) -> Optional[GameState]:
+        """Returns the last published snapshot of a running game if it is in memory"""
+        return self.snapshots.get(game_id)
+
+    async def load_snapshot(self, game_id: int) -> Optional[GameState]:
+        """Returns the last published snapshot of a running game, loading the game when it is not in memory"""
+        snapshot = self.snapshots.get(game_id)
+        if snapshot is None and await self.load(game_id) is not None:
+            snapshot = self.snapshots[game_id]
+        return snapshot
+
+    def snapshot_by_player(self, player_id: int) -> Optional[GameState]:
+        game_id = self.player_games.get(player_id)
+        return self.snapshots.get(game_id) if game_id is not None else None
+
+    def commit(self, state: GameState) -> int:
+        """Publishes an applied action, the changes are persisted in background"""
+        state.version += 1
+        #Replacing the reference publishes the whole action at once
+        self.snapshots[state.id] = freeze_game_state(state)
+        if self.persister is not None:
+            self.persister.mark_dirty(state.id)
+        return state.version
+
+    def evict(self, game_id: int) -> None:
+        """Drops a game from memory, a read of it already running is not registered"""
+        self.reads.pop(game_id, None)
+        state = self.games.pop(game_id, None)
+        self.snapshots.pop(game_id, None)
+        if state is not None:
+            for player_id in state.players:
+                self.player_games.pop(player_id, None)
+
+async def validate_game_state(store: GameStore, id_game: int) -> GameState:
+    """Verifies that a game is running"""
+    state = await store.load(id_game)
+    if state is None:
+        raise HTTPException(status_code=404, detail="INVALID_GAME")
+    return state
+
+async def validate_game_snapshot(store: GameStore, id_game: int) -> GameState:
+    """Verifies that a game is running and returns its last snapshot"""
+    snapshot = await store.load_snapshot(id_game)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="INVALID_GAME")
+    return snapshot
+
+def validate_seat(game: GameState, id_player: int) -> SeatState:
+    """Verifies that a player is seated in the game"""
+    seat = game.players.get(id_player)
+    if seat is None:
+        raise HTTPException(status_code=404, detail="INVALID_PLAYER")
+    return seat
+
+def validate_hand_card(game: GameState, seat: SeatState, id_card: int) -> int:
+    """Verifies that the card is in the player's hand"""
+    if not 0 <= id_card < len(game.manifest):
+        raise HTTPException(status_code=404, detail="INVALID_CARD")
+    if id_card not in seat.hand:
+        raise HTTPException(status_code=404, detail="INVALID_PLAY")
+    return id_card
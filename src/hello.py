@@ -1,30 +1,81 @@
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException, status, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from typing import List
+from fastapi import FastAPI, HTTPException, status, WebSocket, WebSocketDisconnect, Depends, Header, Query
+from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pony.orm import db_session, select, flush
+from pony.orm import flush
 from entities import Player, Game
 from enumerations import Event, Kind, CardName
 from connection_manager import ConnectionManager
-from schemas import CreateGameIn, CreateGameResponse, GameOut, PlayerIn, PlayerId, PlayerOut, GameInDB, PlayerInDB, GameProgress, CardOut
+from backplane import InProcessBackplane
+from game_state import GameStore, validate_game_state, validate_game_snapshot, validate_seat, validate_hand_card
+from persistence import WriteBehindPersister, write_game_state
+from db_executor import DatabaseExecutor
+from outbox import Outbox
+from game_actors import GameActors
+from loaders import EntityLoader, request_loader, read_game_state, db_game_2_game_state
+from lobby_index import LobbyIndex, LobbyBroadcaster
+from schemas import CreateGameIn, CreateGameResponse, GameOut, PlayerIn, PlayerId, GameInDB, PlayerInDB, GameProgress, CardOut
 import json
 import utils
+import game_rules
 import CollaborationManager as cm
 import play_card as card_actions
 import websocket_messages
-import asyncio
+import state_diff
+import random
+import config
 
 app = FastAPI()
 
-connection_manager = ConnectionManager()
+#A single worker holds every game, see backplane.Backplane
+backplane = InProcessBackplane()
+connection_manager = ConnectionManager(backplane=backplane)
 collab_manager = cm.CollaborationManager()
-
-event_join = asyncio.Queue()
+database = DatabaseExecutor()
+#Games missing from memory (after a restart or an eviction) are read in the executor
+game_store = GameStore(loader=lambda game_id: database.run(read_game_state, game_id))
+persister = WriteBehindPersister(game_store, database)
+lobby = LobbyIndex()
+lobby_broadcaster = LobbyBroadcaster(lobby, connection_manager)
+#Actions of the same game are applied one at a time
+actors = GameActors()
+
+def new_game_rng(id_game: int) -> random.Random:
+    """Source of randomness of the seating and the deal, only the server configuration can make it reproducible"""
+    if config.deal_seed is None:
+        return random.Random()
+    return random.Random(config.deal_seed * 1000003 + id_game)
 
 @app.get("/")
 async def get():
     return HTMLResponse(html)
 
+async def open_games() -> LobbyIndex:
+    """Returns the index of open games, it is filled from the database only the first time.
+    It is awaited before a transaction that records lobby changes in its outbox"""
+    if not lobby.loaded:
+        games = await database.run(utils.obtain_games_available)
+        lobby.load(games)
+    return lobby
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await backplane.start()
+    persister.start()
+    lobby_broadcaster.start()
+    collab_manager.start()
+    actors.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await actors.stop()
+    await collab_manager.stop()
+    await lobby_broadcaster.stop()
+    #Writes the running games still dirty
+    await persister.stop()
+    database.shutdown()
+    backplane.close()
+
 origins = ["*"]
 app.add_middleware(
     CORSMiddleware,
@@ -46,6 +97,14 @@ html = """
         <script>
             // Crea una nueva instancia de WebSocket
             const ws = new WebSocket("ws://localhost:8000/ws/join");
+            // El primer mensaje trae el token que identifica a esta conexión
+            let token = null;
+            ws.addEventListener("message", function(event) {
+                const data = JSON.parse(event.data);
+                if (data.event === "connection") {
+                    token = data.token;
+                }
+            });
 
             // Agrega un evento click al botón
             document.getElementById("createGameButton").addEventListener("click", function() {
@@ -57,17 +116,11 @@ html = """
                     password: "",
                 };
 
-                // Crea un objeto con los datos a enviar
-                var requestData = {
-                    websocket: ws,
-                    form: gameInfo
-                };
-
-                // Realiza una solicitud POST al endpoint /create_game
-                fetch('/', {
+                // Realiza una solicitud POST al endpoint /create_game, el token mueve la conexión al juego
+                fetch('/?token=' + token, {
                     method: 'POST',
                     headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify(requestData), // Envía el objeto requestData
+                    body: JSON.stringify(gameInfo), // Envía el objeto gameInfo
                 })
                 .then(response => response.json())
                 .then(data => {
@@ -83,10 +136,11 @@ html = """
 """
 
 @app.post("/", status_code=status.HTTP_201_CREATED)
-async def create_game(websocket: WebSocket, form: CreateGameIn) -> CreateGameResponse:
+async def create_game(form: CreateGameIn, token: str | None = None) -> CreateGameResponse:
     """ Creates a new game
-    Input: CreateGameIn
+    Input: CreateGameIn, token
         Information about the game (name, host, min_players, max_players, password)
+        and the token of the host's connection
     --------
     Output: CreateGameResponse
         Information about the game and host (id, host_id)
@@ -96,7 +150,7 @@ async def create_game(websocket: WebSocket, form: CreateGameIn) -> CreateGameRes
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="INVALID_SETTINGS"
         )
-    with db_session:
+    def create(outbox: Outbox):
         try:
             host = Player(name=form.player_name)
             flush()
@@ -107,41 +161,43 @@ async def create_game(websocket: WebSocket, form: CreateGameIn) -> CreateGameRes
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="INVALID_SETTINGS"
         )
-        response = CreateGameResponse(id=game.id, host_id=game.host.id)
-    #setting websocket to main menu group
-    games = utils.obtain_games_available()
-    try:
-        #Change connection websocket from main menu group to game
-        await event_join.put({'game_id': game.id, 'websocket': websocket})
-        #Create identifier for connection
-        await connection_manager.set_websocket(game.id, host.id, websocket)
-        #Broadcast refresh games to main menu group
-        await connection_manager.send_games(games)
+        outbox.add(lobby.update, utils.db_game_2_game_out(game))
+        #Move the host's connection from main menu group to game and identify it
+        outbox.add(connection_manager.route, token, game.id, host.id)
         #Set Collaboration Manager for game_id
-        collab_manager.init_buffer(game.id)
-    except: raise HTTPException("Connection not found")
+        outbox.add(collab_manager.init_buffer, game.id)
+        return CreateGameResponse(id=game.id, host_id=game.host.id)
 
-    return response
+    await open_games()
+    return await database.transaction(create, Outbox(connection_manager))
 
 #HAY QUE VER SI ESTE ENDPOINT SIGUE SIEDO REALMENTE NECESARIO
 @app.get("/join")
-async def retrieve_availables_games() -> List[GameOut]:
+async def retrieve_availables_games(offset: int = Query(0, ge=0), limit: int | None = Query(None, ge=1),
+                                     free_seats: int = Query(0, ge=0),
+                                     no_password: bool = False, name: str | None = None,
+                                     if_none_match: str | None = Header(None)) -> List[GameOut]:
     """ Get the list of games available
-    Input: None
+    Input: offset, limit, free_seats, no_password, name
+        Page and filters (minimum open seats, games without password, name prefix)
     -------
     Ouput: List[GameOut]
-        A list of current available games
+        A list of current available games, the ETag header is the version of the list
     """
-    with db_session:
-        games = utils.obtain_games_available()
-    
-    return games
+    games = await open_games()
+    etag = f'"{games.version}"'
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    page = games.list_games(offset, limit, free_seats, no_password, name)
+    return Response(json.dumps([g.dict() for g in page]), media_type="application/json", headers={"ETag": etag})
 
 @app.post("/join/{game_id}", status_code=status.HTTP_201_CREATED)
-async def join_game(websocket: WebSocket, game_id: int, player_info: PlayerIn) -> PlayerId:
+@actors.serialize("game_id")
+async def join_game(game_id: int, player_info: PlayerIn, token: str | None = None) -> PlayerId:
     """ Join a game
-    Input: PlayerIn
+    Input: PlayerIn, token
         Information about the player and game (player name, game password)
+        and the token of the player's connection
     -------
     Output: PlayerId   
         Information about the player (id)
@@ -152,8 +208,7 @@ async def join_game(websocket: WebSocket, game_id: int, player_info: PlayerIn) -
             detail="EMPTY_NAME"
         )
 
-    with db_session:
-        
+    def join(outbox: Outbox):
         db_game = utils.validate_game(game_id)
 
         if db_game.in_game:
@@ -174,47 +229,53 @@ async def join_game(websocket: WebSocket, game_id: int, player_info: PlayerIn) -
 
         #Create player instance
         p = Player(name = player_info.player_name, game = db_game, position = db_game.number_of_players)
-        #Setting websocket to game group
-        await event_join.put({'game_id': game_id, 'websocket': websocket})
-        #Create indentifiers for connection
-        await connection_manager.set_websocket(game_id, p.id, websocket)
-        
         db_game.players.add(p)
         db_game.number_of_players += 1
         flush()
-        await connection_manager.send_lobby_info(game_id, utils.game_data_sample(db_game))
-        response = PlayerId(id=p.id)
+        outbox.add(lobby.update, utils.db_game_2_game_out(db_game))
+        #Move the connection to game group and identify it
+        outbox.add(connection_manager.route, token, game_id, p.id)
+        outbox.send_lobby_info(game_id, utils.game_data_sample(db_game))
+        return PlayerId(id=p.id)
 
-    return response
+    await open_games()
+    return await database.transaction(join, Outbox(connection_manager))
 
 @app.delete("/{id_game}/{id_player}")
-async def leave_game(id_game: int, id_player: int) -> dict:
+@actors.serialize("id_game")
+async def leave_game(id_game: int, id_player: int, loader: EntityLoader = Depends(request_loader)) -> dict:
     """Leave a game
     Input: None
     ---------
     Output: Deleted game (Bool)
     """
-    with db_session:
-        game = utils.validate_game(id_game)
-
+    def leave(outbox: Outbox):
+        #The state in memory goes away once the commit is done, a read before that still sees the game
+        outbox.add(game_store.evict, id_game)
+        game = loader.game()
         if game.host.id == id_player:
-            await connection_manager.broadcast(game.id, websocket_messages.InGameMessages.host_leave())
-            players_of_game = Player.select(lambda p: p.game.id == id_game)
-            for player in players_of_game:
+            for player in list(game.players):
                 player.delete()
-                #Move all connections to main menu group and delete their indentifiers
-                await connection_manager.remove_all_connection_of_game(id_game)
+            outbox.add(lobby.remove, id_game)
+            outbox.add(collab_manager.remove_game, id_game)
+            outbox.broadcast(id_game, websocket_messages.InGameMessages.host_leave())
+            #Move all connections to main menu group and delete their indentifiers
+            outbox.add(connection_manager.remove_all_connection_of_game, id_game)
             return {"message": f"Game {id_game} Deleted"}
-        else:
-            player = utils.validate_player(id_player)
-            player.delete()
-            game.number_of_players -= 1
-            await connection_manager.broadcast(game.id, websocket_messages.LobbyMessages(player_name=player.name, game_name=game.name).left_message())
-            #Move connection to main menu group and delete their indentifiers
-            websocket = connection_manager.get_websocket(id_game, player.id)
-            await connection_manager.move_connection(id_game, 0, websocket)
-            await connection_manager.delete_websocket(websocket)
-            return {"message": f"Player {id_player} Deleted"}
+        player = loader.player(id_player)
+        message = websocket_messages.LobbyMessages(player_name=player.name, game_name=game.name).left_message()
+        player.delete()
+        game.number_of_players -= 1
+        outbox.add(lobby.update, utils.db_game_2_game_out(game), not game.in_game)
+        outbox.add(collab_manager.remove_player, id_game, id_player)
+        outbox.broadcast(id_game, message)
+        #Move connection to main menu group and delete their indentifiers
+        outbox.add(connection_manager.leave_game, id_game, id_player)
+        return {"message": f"Player {id_player} Deleted"}
+
+    await open_games()
+    await persister.flush_async(id_game)
+    return await database.transaction(leave, Outbox(connection_manager))
 
 
 @app.get("/player/{player_id}")
@@ -225,10 +286,14 @@ async def get_player_info(player_id: int) -> PlayerInDB:
     Ouput: PlayerInDB
         Player Information
     """
-    with db_session:
+    snapshot = game_store.snapshot_by_player(player_id)
+    if snapshot is not None:
+        return utils.seat_2_player_schemas(snapshot, snapshot.players[player_id])
+    def read():
         db_player = utils.validate_player(player_id)
-        player = utils.db_player_2_player_schemas(db_player)
-    return player
+        return utils.db_player_2_player_schemas(db_player)
+
+    return await database.run(read)
 
 @app.get("/game/{game_id}")
 async def get_game_info(game_id: int) -> GameInDB:
@@ -239,22 +304,36 @@ async def get_game_info(game_id: int) -> GameInDB:
         Information about the game
     """
     #preguntar que versión debería persistir
-    with db_session:
-        game = utils.validate_game(game_id)
-        game_data = utils.game_data_sample(game)
-        return game_data
-
+    snapshot = await game_store.load_snapshot(game_id)
+    if snapshot is not None:
+        return Response(utils.game_state_2_json(snapshot), media_type="application/json")
+    return await database.run(lambda: utils.game_data_sample(utils.validate_game(game_id)))
+
+@app.get("/game/{game_id}/sync")
+async def sync_game(game_id: int, version: int | None = None) -> Response:
+    """Resynchronizes a client of a running game
+    Input: version
+        Last version the client applied
+    ---------
+    Output: GameInDB
+        Full game information when the version is stale, just the version otherwise
+    """
+    game = await validate_game_snapshot(game_store, game_id)
+    if state_diff.is_stale(game, version):
+        return Response(utils.game_state_2_json(game), media_type="application/json")
+    return Response(json.dumps({"version": game.version}), media_type="application/json")
 
 @app.patch("/{id_game}/{id_player}", status_code=status.HTTP_200_OK)
-async def start_game(id_game: int, id_player: int) -> dict:
+@actors.serialize("id_game")
+async def start_game(id_game: int, id_player: int, loader: EntityLoader = Depends(request_loader)) -> dict:
     """Starts the game
-    Input: none
+    Input: None
     ---------
     Ouput: Success/Failure
     """
-    with db_session:
-        player = utils.validate_player(id_player)
-        game = utils.validate_game(id_game)
+    def start(outbox: Outbox):
+        game = loader.game()
+        player = loader.player(id_player)
         
         if game.number_of_players < game.min_players:
             raise HTTPException(
@@ -269,36 +348,47 @@ async def start_game(id_game: int, id_player: int) -> dict:
             )
         
         game.in_game = True
-
-        utils.shuffle_and_assign_positions(game.players)
-        utils.create_deck(game.id)
-        utils.deal_cards(game.id)
+        rng = new_game_rng(id_game)
+        utils.shuffle_and_assign_positions(game.players, rng)
         flush()
-        await connection_manager.send_lobby_info(id_game, utils.game_data_sample(game))
-        await connection_manager.broadcast(game.id, websocket_messages.InGameMessages(game_name=game.name).start_message())
-        await connection_manager.broadcast(game.id, websocket_messages.GameEvents(player_name=game.players[game.current_turn].name).draw_card()) 
+        state = db_game_2_game_state(game)
+        state.rng = rng
+        game_rules.create_deck(state)
+        game_rules.deal_cards(state)
+        write_game_state(state)
+        outbox.add(lobby.remove, id_game)
+        outbox.add(game_store.register, state)
+        outbox.add(state_diff.reset_view, state)
+        outbox.send_lobby_info(id_game, utils.game_state_2_json(state))
+        outbox.broadcast(id_game, websocket_messages.LobbyMessages(game_name=state.name).start_message())
+        outbox.broadcast(id_game, websocket_messages.game_event(Event.DRAW, state.seat_at(state.current_turn).name))
         return {"message": f"Game {id_game} Started"}
+
+    await open_games()
+    return await database.transaction(start, Outbox(connection_manager))
     
 @app.patch('/game/{id_game}/turn', status_code=status.HTTP_200_OK)
+@actors.serialize("id_game")
 async def draw_card(id_game: int, id_player: int) -> bool:
     """Draws a card to the given player"""
-    with db_session:
-        game = utils.validate_game(id_game)
-        player = utils.validate_player(id_player)
-        if(game.in_game and player.position == game.current_turn):
-            utils.draw_card(game, player)
-            flush()
-            await connection_manager.broadcast(game.id, websocket_messages.GameEvents(player_name=player.name).play_card())
-        elif(game.in_game and player.position != game.current_turn and len(player.hand) == 3):
-            utils.draw_card(game, player)
-            flush()
-            await connection_manager.broadcast(game.id, websocket_messages.GameEvents(player_name=player.name).wait())
-        else: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="INVALID_ACTION")
-        await connection_manager.send_lobby_info(id_game, utils.game_data_sample(game))
-        await connection_manager.broadcast(game.id, websocket_messages.InGameMessages(player_name=player.name).new_turn())
+    game = await validate_game_state(game_store, id_game)
+    player = validate_seat(game, id_player)
+    outbox = Outbox(connection_manager)
+    if(game.in_game and player.position == game.current_turn):
+        game_rules.draw_card(game, player)
+        outbox.broadcast(game.id, websocket_messages.game_event(Event.PLAY_CARD, player.name))
+    elif(game.in_game and player.position != game.current_turn and len(player.hand) == 3):
+        game_rules.draw_card(game, player)
+        outbox.broadcast(game.id, websocket_messages.game_event(Event.WAIT, player.name))
+    else: raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="INVALID_ACTION")
+    game_store.commit(game)
+    outbox.broadcast(id_game, state_diff.game_state_2_delta_json(game))
+    outbox.broadcast(game.id, websocket_messages.InGameMessages(player_name=player.name).new_turn())
+    await outbox.dispatch()
     return True
 
 @app.patch("/{id_game}/{id_player}/{id_card}/{id_player_afected}", status_code=status.HTTP_200_OK)
+@actors.serialize("id_game")
 async def play_card(id_game: int, id_player: int, id_card: int, id_player_afected: int) -> dict:
     """Plays a card
     Input: 
@@ -307,57 +397,46 @@ async def play_card(id_game: int, id_player: int, id_card: int, id_player_afecte
     Output: GameProgress
         Information about the game progress
     """
-    with db_session:
-        game = utils.validate_game(id_game)
-        player = utils.validate_player(id_player)
-        card = utils.validate_card(id_card, id_player)
-
-        if card.name == CardName.WATCH_YOUR_BACK:
-            if not (id_player_afected is None):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="INVALID_PLAY"
-                )
-        else:
-            player_afected = utils.validate_player(id_player_afected)
-
-        if player.position != game.current_turn:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="NOT_ON_TURN"
-            )
-
-        if card.kind != Kind.ACTION:
+    game = await validate_game_state(game_store, id_game)
+    player = validate_seat(game, id_player)
+    card = validate_hand_card(game, player, id_card)
+    card_name = game.card(card).name
+
+    player_afected = None
+    if card_name == CardName.WATCH_YOUR_BACK:
+        if not (id_player_afected is None):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="INVALID_PLAY"
             )
-        
-        match card.name: 
-            case CardName.FLAMETHROWER:
-                card_actions.play_flamethrower(game, player_afected)
-            case CardName.WATCH_YOUR_BACK:
-                mensaje = card_actions.play_watch_your_back(game)
-            case CardName.SWAP_PLACES:
-                mensaje = card_actions.play_swap_places(game, player, player_afected)
-            case CardName.YOU_BETTER_RUN:
-                mensaje = card_actions.play_you_better_run(player ,player_afected)
-            case CardName.SEDUCTION:
-                mensaje = card_actions.play_seduction(player, player_afected)
-            case CardName.ANALYSIS:
-                mensaje = card_actions.show_cards_to_player(player_afected)
-            case CardName.WHISKY:
-                mensaje = card_actions.show_cards_to_player(player)
-            case _:
-                pass
-        
-        utils.discard_card(game, player, card)
-        #se hace acá para primer probar la funcionalidad sin intercamio de cartas
-        turn = utils.change_turn(game)
-        await connection_manager.broadcast(game.id, websocket_messages.GameEvents(player_name=player.name).draw_card())
-        utils.db_game_2_game_progress(game)
-        return {"game_progress": utils.db_game_2_game_progress(game), 
-                "message": mensaje}
+    else:
+        player_afected = validate_seat(game, id_player_afected)
+
+    if player.position != game.current_turn:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="NOT_ON_TURN"
+        )
+
+    if game.card(card).kind != Kind.ACTION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="INVALID_PLAY"
+        )
+
+    mensaje = card_actions.apply_card(game, card_name, player, player_afected)
+    
+    game_rules.discard_card(game, player, card)
+    #se hace acá para primer probar la funcionalidad sin intercamio de cartas
+    game_rules.change_turn(game)
+    game.is_done = game_rules.is_game_over(game)
+    game_store.commit(game)
+    outbox = Outbox(connection_manager)
+    outbox.broadcast(id_game, state_diff.game_state_2_delta_json(game))
+    outbox.broadcast(game.id, websocket_messages.game_event(Event.DRAW, player.name))
+    await outbox.dispatch()
+    return {"game_progress": utils.db_game_2_game_progress(game), 
+            "message": mensaje}
 
 @app.get("/{id_game}/{id_player}/{id_card}", status_code=status.HTTP_200_OK)
 async def retrieve_information(id_game: int, id_player:int, id_card: int) -> CardOut:
@@ -367,28 +446,30 @@ async def retrieve_information(id_game: int, id_player:int, id_card: int) -> Car
     Output: CardOut
         Information about the card
     """
-    with db_session:
-        game = utils.validate_game(id_game)
-        player = utils.validate_player(id_player)
-        card = utils.validate_card(id_card, id_player)
+    game = await validate_game_snapshot(game_store, id_game)
+    player = validate_seat(game, id_player)
+    card = validate_hand_card(game, player, id_card)
 
-        return utils.db_card_2_card_out(card, player)
+    return utils.card_state_2_card_out(game, player, card)
 
 @app.delete("/{id_game}/{id_player}/{id_card}", status_code=status.HTTP_200_OK)
+@actors.serialize("id_game")
 async def discard_card(id_game: int, id_player:int, id_card: int) -> bool:
     """Discards a card from player hand"""
-    with db_session:
-        game = utils.validate_game(id_game)
-        player = utils.validate_player(id_player)
-        card = utils.validate_card(id_card, id_player)
-        utils.discard_card(game, player, card)
-        flush()
-        await connection_manager.send_lobby_info(id_game, utils.game_data_sample(game))
-        await connection_manager.broadcast(game.id, websocket_messages.InGameMessages(player_name=player.name, card=card.name).discard())
+    game = await validate_game_state(game_store, id_game)
+    player = validate_seat(game, id_player)
+    card = validate_hand_card(game, player, id_card)
+    game_rules.discard_card(game, player, card)
+    game_store.commit(game)
+    outbox = Outbox(connection_manager)
+    outbox.broadcast(id_game, state_diff.game_state_2_delta_json(game))
+    outbox.broadcast(game.id, websocket_messages.InGameMessages(player_name=player.name, card=game.card(card).name).discard())
+    await outbox.dispatch()
     
     return True
 
 @app.post("/{id_game}/{id_player}/{id_card}/start_exchange", status_code=status.HTTP_200_OK)
+@actors.serialize("id_game")
 async def start_exchange(id_game: int, id_player:int, id_card: int) -> None:
     """Start a new exchange with another player
     Input: id_game, id_player, id_card
@@ -398,21 +479,17 @@ async def start_exchange(id_game: int, id_player:int, id_card: int) -> None:
     Websocket message:
         Message sended to all players in same game, it containts the event "invite_exchange" with the player name that as to respond
     """
-    with db_session:
-        game = utils.validate_game(id_game)
-        player = utils.validate_player(id_player)
-        card = utils.validate_card(id_card, id_player)
-        if game.going_clockwise:
-            player2_id = select(p for p in Player if p.game == game and p.position == ((player.position + 1) % game.number_of_players)).first().id
-        else:
-            player2_id = select(p for p in Player if p.game == game and p.position == ((player.position - 1) % game.number_of_players)).first().id
-        player2 = utils.validate_player(player2_id)
-        #Fill collaboration manager with player and card data
-        collab_manager.add_first_collaboration(game.id, {"player": player.id, "card": card.id})
-        ws_message = websocket_messages.GameEvents(player_name=player2.name, event=Event.EXCHANGE_INVITATION).invite_exchange()
-        await connection_manager.broadcast(game.id, ws_message)
+    game = await validate_game_state(game_store, id_game)
+    player = validate_seat(game, id_player)
+    card = validate_hand_card(game, player, id_card)
+    player2 = game.seat_ring().neighbour(player, game.going_clockwise)
+    #Fill collaboration manager with player and card data
+    collab_manager.add_first_collaboration(game.id, {"player": player.id, "card": card}, invited=player2.id)
+    ws_message = websocket_messages.game_event(Event.EXCHANGE_INVITATION, player2.name)
+    await connection_manager.broadcast(game.id, ws_message)
 
 @app.post("/{id_game}/{id_player}/{id_card}/end_exchange", status_code=status.HTTP_200_OK)
+@actors.serialize("id_game")
 async def complete_exchenge(id_game: int, id_player:int, id_card: int) -> None:
     """Complete the exchange with another player
     Input: id_game, id_player, id_card
@@ -422,56 +499,67 @@ async def complete_exchenge(id_game: int, id_player:int, id_card: int) -> None:
     Websocket message:
         Message to all players of the same game, with the name of the next turn player
     """
-    with db_session:
-        game = utils.validate_game(id_game)
-        player2 = utils.validate_player(id_player)
-        card2 = utils.validate_card(id_card, id_player)
-        inviter_data = collab_manager.get_just_p1_data(id_game)
-        player1 = utils.validate_player(inviter_data.get("player"))
-        card1 = utils.validate_card(inviter_data.get("card"), inviter_data.get("player"))
-        utils.exchange_card(player1, player2, card1, card2)
-        # Aca se deberia checkear si se termina o no la partida...
-        next_turn_player = utils.next_turn_player_name(game)
-        ws_message = websocket_messages.GameEvents(player_name=next_turn_player).draw_card()
-        await connection_manager.broadcast_message(game.id, ws_message)
+    game = await validate_game_state(game_store, id_game)
+    player2 = validate_seat(game, id_player)
+    card2 = validate_hand_card(game, player2, id_card)
+    session = collab_manager.get_session(id_game)
+    if session is None or session.invited not in (None, player2.id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="INVALID_ACTION"
+        )
+    inviter_data = collab_manager.get_just_p1_data(id_game)
+    player1 = validate_seat(game, inviter_data.get("player"))
+    card1 = validate_hand_card(game, player1, inviter_data.get("card"))
+    game_rules.exchange_card(game, player1, player2, card1, card2)
+    game.is_done = game_rules.is_game_over(game)
+    game_store.commit(game)
+    outbox = Outbox(connection_manager)
+    outbox.broadcast(id_game, state_diff.game_state_2_delta_json(game))
+    # Aca se deberia checkear si se termina o no la partida...
+    next_turn_player = game_rules.next_turn_player_name(game)
+    outbox.broadcast(game.id, websocket_messages.game_event(Event.DRAW, next_turn_player))
+    await outbox.dispatch()
 
 #revaluar todo este endpoint en general
 @app.post("/{id_game}/{id_player}/{id_card}", status_code=status.HTTP_200_OK)
+@actors.serialize("id_game")
 async def exchange_card(id_game: int, id_player:int, id_card1: int, id_card2: int) -> GameProgress:
     """Exchanges a card with another player"""
-    with db_session:
-        game = utils.validate_game(id_game)
-        player1 = utils.validate_player(id_player)
-        if game.going_clockwise:
-            player2_id = select(p for p in Player if p.game == game and p.position == ((player1.position + 1) % game.number_of_players)).first().id
-        else:
-            player2_id = select(p for p in Player if p.game == game and p.position == ((player1.position - 1) % game.number_of_players)).first().id
-        player2 = utils.validate_player(player2_id)
-        card1 = utils.validate_card(id_card1, id_player)
-        card2 = utils.validate_card(id_card2, player2.id)
+    game = await validate_game_state(game_store, id_game)
+    player1 = validate_seat(game, id_player)
+    player2 = game.seat_ring().neighbour(player1, game.going_clockwise)
+    card1 = validate_hand_card(game, player1, id_card1)
+    card2 = validate_hand_card(game, player2, id_card2)
 
-        if player1.is_dead or player2.is_dead or player2.in_lockdown:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="INVALID_PLAY"
-            )
-        utils.exchange_card(player1, player2, card1, card2)
-        return utils.db_game_2_game_progress(game)
+    if player1.is_dead or player2.is_dead or player2.in_lockdown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="INVALID_PLAY"
+        )
+    game_rules.exchange_card(game, player1, player2, card1, card2)
+    game.is_done = game_rules.is_game_over(game)
+    game_store.commit(game)
+    return utils.db_game_2_game_progress(game)
 
 @app.delete("/{id_game}", status_code=status.HTTP_200_OK)
-async def finish_game(id_game: int) -> dict:
+@actors.serialize("id_game")
+async def finish_game(id_game: int, loader: EntityLoader = Depends(request_loader)) -> dict:
     """Finishes the game
     Input: none
     ---------
     Ouput: List of winners
     """
-    with db_session:
-        game = utils.validate_game(id_game)
+    def finish(outbox: Outbox):
+        #The state in memory goes away once the commit is done, a read before that still sees the game
+        outbox.add(game_store.evict, id_game)
+        game = loader.game()
         if(game.in_game):
             game.in_game = False
-            response = utils.get_winners(game)
-            players_of_game = Player.select(lambda p: p.game.id == id_game)
-            for player in players_of_game:
+            response = game_rules.get_winners(db_game_2_game_state(game))
+            #Deleting the host deletes the game too, take its information before
+            game_data = utils.game_data_sample(game)
+            for player in list(game.players):
                 player.delete()
         else:
             raise HTTPException(
@@ -479,23 +567,23 @@ async def finish_game(id_game: int) -> dict:
                 detail="INVALID_ACTION"
             )
         flush()
-        await connection_manager.send_lobby_info(id_game, utils.game_data_sample(game))
-        await connection_manager.remove_all_connection_of_game(id_game)
-    return response
+        outbox.add(lobby.remove, id_game)
+        outbox.add(collab_manager.remove_game, id_game)
+        outbox.send_lobby_info(id_game, game_data)
+        outbox.add(connection_manager.remove_all_connection_of_game, id_game)
+        return response
+
+    await open_games()
+    await persister.flush_async(id_game)
+    return await database.transaction(finish, Outbox(connection_manager))
 
 @app.websocket("/ws/join")
 async def websocket_join(websocket: WebSocket):
-    await connection_manager.connect(0, websocket)
+    token = await connection_manager.connect(0, websocket)
+    await connection_manager.send_personal_message(0, websocket_messages.connection_message(token), websocket)
     try:
-        with db_session:
-            games = utils.obtain_games_available()
-            while True:
-                #Obtener a que juego se unió el jugador
-                data = await event_join.get()
-                game_id = data['game_id']
-                #Cambiar a esa conección
-                await connection_manager.move_connection(0, game_id, websocket)
+        while True:
+            #Crear o unirse a un juego mueve la conexión con su token, acá solo se espera el cierre
+            await websocket.receive_text()
     except WebSocketDisconnect:
-        connection_manager.disconnect(0, websocket)
-        await connection_manager.delete_websocket(websocket)
-    return games
+        connection_manager.drop_connection(websocket)
@@ -0,0 +1,85 @@
+from array import array
+from typing import Dict, Optional
+from fastapi import HTTPException
+from pony.orm import select
+from entities import db, Game, Player
+from game_state import GameState, SeatState
+
+def query_count() -> int:
+    """Number of SQL statements executed by this thread so far"""
+    return db.local_stats[None].db_count
+
+def load_game(id_game: int) -> Optional[Game]:
+    """Loads a game with its players in a single prefetching query, Pony runs it as the game row and its players.
+    The host is one of the players, so it comes from the same set"""
+    return select(g for g in Game if g.id == id_game).prefetch(Game.players).first()
+
+def db_game_2_game_state(db_game: Game) -> GameState:
+    """Builds the in-memory state of a game from the database"""
+    state = GameState(db_game.id, db_game.name, db_game.host.id)
+    state.current_turn = db_game.current_turn
+    state.in_game = db_game.in_game
+    state.is_done = db_game.is_done
+    state.password = db_game.password
+    state.going_clockwise = db_game.going_clockwise
+    state.min_players = db_game.min_players
+    state.max_players = db_game.max_players
+    state.number_of_players = db_game.number_of_players
+    state.manifest = db_game.card_manifest or b""
+    state.deck = array("B", db_game.deck_cards or b"")
+    state.discarded = array("B", db_game.discarded_cards or b"")
+
+    for db_player in db_game.players:
+        seat = SeatState(db_player.id, db_player.name, db_player.position, db_player.role)
+        seat.is_dead = db_player.is_dead
+        seat.in_lockdown = db_player.in_lockdown
+        seat.left_barrier = db_player.left_barrier
+        seat.right_barrier = db_player.right_barrier
+        seat.hand = array("B", db_player.hand_cards or b"")
+        state.players[seat.id] = seat
+    state.count_roles()
+    return state
+
+def read_game_state(id_game: int) -> Optional[GameState]:
+    """Builds the state of a running game from the database, None if it is not running.
+    It must run inside a db_session, the state it returns holds no entities"""
+    game = load_game(id_game)
+    if game is None or not game.in_game:
+        return None
+    return db_game_2_game_state(game)
+
+class EntityLoader:
+    """Loads the entities of a request by primary key, each one at most once.
+    It must be used inside the db_session of the request"""
+
+    def __init__(self, id_game: int) -> None:
+        self.id_game = id_game
+        self.games: Dict[int, Game] = {}
+        self.players: Dict[int, Player] = {}
+
+    def game(self, id_game: Optional[int] = None) -> Game:
+        """Returns the game of the request with its players already loaded"""
+        id_game = self.id_game if id_game is None else id_game
+        game = self.games.get(id_game)
+        if game is None:
+            game = load_game(id_game)
+            if game is None:
+                raise HTTPException(status_code=404, detail="INVALID_GAME")
+            self.games[id_game] = game
+            for player in game.players:
+                self.players[player.id] = player
+        return game
+
+    def player(self, id_player: int) -> Player:
+        """Returns a player, without querying when it was loaded with the game"""
+        player = self.players.get(id_player)
+        if player is None:
+            player = Player.get(id=id_player)
+            if player is None:
+                raise HTTPException(status_code=404, detail="INVALID_PLAYER")
+            self.players[id_player] = player
+        return player
+
+def request_loader(id_game: int) -> EntityLoader:
+    """Dependency that gives each request its own loader"""
+    return EntityLoader(id_game)
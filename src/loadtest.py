@@ -0,0 +1,232 @@
+"""In-process load test of the API, it runs the app of hello.py without network.
+N games with M websocket clients each are created, joined, started and played at the same time.
+Prints a JSON report with the latency of each endpoint, the broadcast delivery lag and the throughput.
+
+    $ python loadtest.py --games 100 --clients 6 --turns 20 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Optional
+import config
+
+#Cards the load test plays, they change the turn and have targets
+PLAYED = ("Lanzallamas", "Análisis", "Cambio de lugar!")
+#Cards that can not be given in an exchange, only a human's Infectado! can be discarded
+KEPT = ("La Cosa", "Infectado!")
+INFECTED = "Infectado!"
+
+def percentiles(samples: List[float]) -> dict:
+    """p50, p95 and p99 in milliseconds"""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+class Metrics:
+    def __init__(self) -> None:
+        self.latencies: DefaultDict[str, List[float]] = defaultdict(list)
+        self.errors: DefaultDict[str, int] = defaultdict(int)
+        self.lags: List[float] = []
+        self.messages = 0
+        #Turns that raised in the harness, their game stops there
+        self.failed_turns = 0
+
+    def report(self, elapsed: float) -> dict:
+        requests = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "seconds": round(elapsed, 3),
+            "requests": requests,
+            "requests_per_second": round(requests / elapsed, 1),
+            "failed_turns": self.failed_turns,
+            "endpoints": {
+                name: {"count": len(samples), "errors": self.errors[name], **percentiles(samples)}
+                for name, samples in sorted(self.latencies.items())
+            },
+            "broadcast": {
+                "messages": self.messages,
+                "messages_per_second": round(self.messages / elapsed, 1),
+                "lag": percentiles(self.lags),
+            },
+        }
+
+class WebSocketClient:
+    """Client of a websocket endpoint that talks to the ASGI app directly"""
+
+    def __init__(self, app, path: str, on_message: Callable[["WebSocketClient", str, float], None]) -> None:
+        self.app = app
+        self.path = path
+        self.on_message = on_message
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.token: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> str:
+        """Opens the connection and returns the token the server gave it"""
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": self.path,
+            "raw_path": self.path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "server": ("loadtest", 80), "client": ("loadtest", 0), "subprotocols": [],
+        }
+        self.incoming.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.create_task(self.app(scope, self.incoming.get, self._send))
+        return await self.token
+
+    async def close(self) -> None:
+        self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await self.task
+
+    async def _send(self, message: dict) -> None:
+        if message["type"] != "websocket.send":
+            return
+        text = message.get("text") or ""
+        if not self.token.done():
+            self.token.set_result(json.loads(text)["token"])
+            return
+        self.on_message(self, text, time.perf_counter())
+
+class LoadTest:
+    def __init__(self, app, games: int, clients: int, turns: int) -> None:
+        import httpx
+        #Errors of the app come back as 500 responses and are counted
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        self.http = httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+        self.app = app
+        self.games = games
+        self.clients = clients
+        self.turns = turns
+        self.metrics = Metrics()
+        #Game id -> when its last action was sent, the base of the broadcast lag
+        self.action_started: Dict[int, float] = {}
+        self.client_games: Dict[WebSocketClient, int] = {}
+
+    async def request(self, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await self.http.request(method, url, **kwargs)
+        self.metrics.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.metrics.errors[name] += 1
+            return None
+        return response.json()
+
+    def on_message(self, client: WebSocketClient, text: str, received: float) -> None:
+        self.metrics.messages += 1
+        started = self.action_started.get(self.client_games.get(client))
+        if started is not None and text.startswith('{"event": "game_delta"'):
+            self.metrics.lags.append(received - started)
+
+    async def action(self, game_id: int, name: str, method: str, url: str, **kwargs):
+        self.action_started[game_id] = time.perf_counter()
+        return await self.request(name, method, url, **kwargs)
+
+    async def play_game(self, num: int) -> None:
+        clients = [WebSocketClient(self.app, "/ws/join", self.on_message) for _ in range(self.clients)]
+        tokens = [await client.connect() for client in clients]
+        created = await self.request("create_game", "POST", f"/?token={tokens[0]}", json={
+            "game_name": f"Load {num}", "player_name": "Host", "min_players": min(4, self.clients),
+            "max_players": max(4, self.clients), "password": "",
+        })
+        if created is None:
+            return
+        game_id, host_id = created["id"], created["host_id"]
+        for client in clients:
+            self.client_games[client] = game_id
+        for index, token in enumerate(tokens[1:], 1):
+            await self.request("join_game", "POST", f"/join/{game_id}?token={token}", json={
+                "player_name": f"Player {index}", "password": "",
+            })
+        await self.action(game_id, "start_game", "PATCH", f"/{game_id}/{host_id}")
+        for _ in range(self.turns):
+            try:
+                if not await self.play_turn(game_id):
+                    break
+            except Exception:
+                self.metrics.failed_turns += 1
+                break
+        await self.request("finish_game", "DELETE", f"/{game_id}")
+        for client in clients:
+            await client.close()
+
+    async def play_turn(self, game_id: int) -> bool:
+        game = await self.request("game_info", "GET", f"/game/{game_id}")
+        if game is None or game["is_done"]:
+            return False
+        living = sorted((p for p in game["players"] if not p["is_dead"]), key=lambda p: p["postition"])
+        index = next(i for i, p in enumerate(living) if p["postition"] == game["current_turn"])
+        player = living[index]["player_id"]
+        partner = living[(index + (1 if game["going_clockwise"] else -1)) % len(living)]["player_id"]
+
+        await self.action(game_id, "draw_card", "PATCH", f"/game/{game_id}/turn?id_player={player}")
+        hand = await self.hand(player)
+        if not hand:
+            return False
+        for card_id, name in hand:
+            if name in PLAYED:
+                card = await self.request("card_info", "GET", f"/{game_id}/{player}/{card_id}")
+                if card and card["playable"] and card["players"]:
+                    target = card["players"][0]["player_id"]
+                    await self.action(game_id, "play_card", "PATCH", f"/{game_id}/{player}/{card_id}/{target}")
+                    return True
+
+        #Getting rid of an Infectado! first keeps the hand able to exchange
+        discardable = [c for c, name in hand if name == INFECTED] + [c for c, name in hand if name not in KEPT]
+        if not discardable:
+            return False
+        discard = discardable[0]
+        await self.action(game_id, "discard_card", "DELETE", f"/{game_id}/{player}/{discard}")
+        give = next((c for c, name in hand if name not in KEPT and c != discard), None)
+        if partner == player or give is None:
+            return True
+        answer = next((c for c, name in await self.hand(partner) if name not in KEPT), None)
+        if answer is None:
+            return True
+        await self.action(game_id, "start_exchange", "POST", f"/{game_id}/{player}/{give}/start_exchange")
+        await self.action(game_id, "complete_exchange", "POST", f"/{game_id}/{partner}/{answer}/end_exchange")
+        return True
+
+    async def hand(self, player: int) -> List[list]:
+        """(card id, name) of the cards of a player, empty if it could not be read"""
+        info = await self.request("player_info", "GET", f"/player/{player}")
+        return info["card"] if info is not None else []
+
+    async def run(self) -> dict:
+        #Like uvicorn, the app starts its background tasks before the first request and stops them after the last
+        await self.app.router.startup()
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(self.play_game(num) for num in range(self.games)))
+            #Let the writers deliver what is still queued
+            await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - start
+        finally:
+            await self.http.aclose()
+            await self.app.router.shutdown()
+        report = self.metrics.report(elapsed)
+        report.update({"games": self.games, "clients_per_game": self.clients, "turns": self.turns})
+        return report
+
+def run_load_test(games: int, clients: int, turns: int, database: str = "loadtest.sqlite", seed: Optional[int] = 0) -> dict:
+    """Runs the load test on its own database, it must be called before anything imports the entities.
+    The seed makes the deals reproducible between runs"""
+    config.databasename = database
+    config.deal_seed = seed
+    from hello import app
+    return asyncio.run(LoadTest(app, games, clients, turns).run())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the API without network")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=6)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--database", default="loadtest.sqlite")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = json.dumps(run_load_test(args.games, args.clients, args.turns, args.database, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report)
+    print(report)
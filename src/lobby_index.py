@@ -0,0 +1,154 @@
+import asyncio
+import json
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from schemas import GameOut
+from scheduling import schedule_once, cancel_tasks
+import config
+
+class LobbyIndex:
+    """Games open to join, kept in memory so listing them never queries the database"""
+
+    def __init__(self) -> None:
+        #Game id -> game, in creation order
+        self.games: Dict[int, GameOut] = {}
+        #(casefolded name, game id) sorted, to search by name prefix
+        self.names: List[tuple[str, int]] = []
+        self.version = 0
+        self.loaded = False
+        #Games the menu clients already know about and the ones changed since the last delta
+        self.published: set[int] = set()
+        self.published_version = 0
+        self.pending: set[int] = set()
+        self.on_change: Optional[Callable[[], None]] = None
+
+    def load(self, games: Iterable[GameOut]) -> None:
+        """Fills the index with the games already open, only the first call has effect"""
+        if self.loaded:
+            return
+        for game in games:
+            if game.id not in self.games:
+                self._add(game)
+        self.loaded = True
+        self.version += 1
+        self.published.update(self.games)
+        self.published_version = self.version
+
+    def update(self, game: GameOut, is_open: bool = True) -> None:
+        """Adds, refreshes or removes a game after it was created, joined, left or started"""
+        if is_open and game.number_of_players < game.max_players:
+            if game.id in self.games:
+                self.games[game.id] = game
+            else:
+                self._add(game)
+        elif game.id in self.games:
+            self._remove(game.id)
+        else:
+            return
+        self._changed(game.id)
+
+    def remove(self, game_id: int) -> None:
+        if game_id in self.games:
+            self._remove(game_id)
+            self._changed(game_id)
+
+    def take_delta(self) -> Optional[dict]:
+        """Returns the games added, changed and removed since the last delta, None if there is nothing to send"""
+        added, changed, removed = [], [], []
+        for game_id in sorted(self.pending):
+            game = self.games.get(game_id)
+            if game is None:
+                if game_id in self.published:
+                    self.published.discard(game_id)
+                    removed.append(game_id)
+            elif game_id in self.published:
+                changed.append(game.dict())
+            else:
+                self.published.add(game_id)
+                added.append(game.dict())
+        self.pending.clear()
+        if not (added or changed or removed):
+            return None
+        delta = {
+            "event": "lobby_delta",
+            "base": self.published_version,
+            "version": self.version,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+        }
+        self.published_version = self.version
+        return delta
+
+    def list_games(self, offset: int = 0, limit: Optional[int] = None, free_seats: int = 0,
+                   no_password: bool = False, name_prefix: Optional[str] = None) -> List[GameOut]:
+        """Returns a page of the open games that match the filters"""
+        games: Iterator[GameOut] = iter(self.games.values())
+        if name_prefix:
+            games = self._by_prefix(name_prefix.casefold())
+        if free_seats > 0:
+            games = (g for g in games if g.max_players - g.number_of_players >= free_seats)
+        if no_password:
+            games = (g for g in games if not g.password)
+        stop = None if limit is None else offset + limit
+        return list(islice(games, offset, stop))
+
+    def _by_prefix(self, prefix: str) -> Iterator[GameOut]:
+        start = bisect_left(self.names, (prefix, -1))
+        ids = []
+        for index in range(start, len(self.names)):
+            name, game_id = self.names[index]
+            if not name.startswith(prefix):
+                break
+            ids.append(game_id)
+        return (self.games[game_id] for game_id in sorted(ids))
+
+    def _changed(self, game_id: int) -> None:
+        self.version += 1
+        self.pending.add(game_id)
+        if self.on_change is not None:
+            self.on_change()
+
+    def _add(self, game: GameOut) -> None:
+        self.games[game.id] = game
+        insort(self.names, (game.name.casefold(), game.id))
+
+    def _remove(self, game_id: int) -> None:
+        game = self.games.pop(game_id)
+        key = (game.name.casefold(), game_id)
+        del self.names[bisect_left(self.names, key)]
+
+class LobbyBroadcaster:
+    """Sends the lobby changes to the main menu group as one delta per window"""
+
+    def __init__(self, index: LobbyIndex, connection_manager, window: float = config.lobby_broadcast_window) -> None:
+        self.index = index
+        self.connection_manager = connection_manager
+        self.window = window
+        #Loop where the deltas are sent, set by start
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        index.on_change = self.notify
+
+    def start(self) -> None:
+        """Sends the deltas from the running loop until stop is called"""
+        self.loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        self.loop = None
+        await cancel_tasks(self._task)
+        self._task = None
+
+    def notify(self) -> None:
+        #Until it is started nobody is listening, the change goes with the next delta
+        self._task = schedule_once(self.loop, self._task, self._send_later)
+
+    async def _send_later(self) -> None:
+        await asyncio.sleep(self.window)
+        await self.flush()
+
+    async def flush(self) -> None:
+        delta = self.index.take_delta()
+        if delta is not None:
+            await self.connection_manager.broadcast(0, json.dumps(delta))
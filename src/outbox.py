@@ -0,0 +1,32 @@
+import inspect
+from typing import Any, Callable, List
+
+class Outbox:
+    """Effects of an action outside the database: messages, connection and lobby changes.
+    They are recorded while the action runs and only happen after it was committed"""
+
+    def __init__(self, connection_manager) -> None:
+        self.connection_manager = connection_manager
+        self.effects: List[tuple[Callable[..., Any], tuple]] = []
+
+    def add(self, effect: Callable[..., Any], *args) -> None:
+        """Records a call, it may be a coroutine function"""
+        self.effects.append((effect, args))
+
+    def broadcast(self, game_id: int, message: str) -> None:
+        self.add(self.connection_manager.broadcast, game_id, message)
+
+    def send_lobby_info(self, game_id: int, game_info) -> None:
+        self.add(self.connection_manager.send_lobby_info, game_id, game_info)
+
+    def discard(self) -> None:
+        """Forgets the effects of an action that was rolled back"""
+        self.effects.clear()
+
+    async def dispatch(self) -> None:
+        """Runs the recorded effects in order, must be called on the event loop"""
+        effects, self.effects = self.effects, []
+        for effect, args in effects:
+            result = effect(*args)
+            if inspect.isawaitable(result):
+                await result
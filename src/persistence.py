@@ -0,0 +1,111 @@
+import asyncio
+from concurrent.futures import Future
+from typing import List, Optional
+from pony.orm import db_session
+from entities import Game, Player
+from game_state import GameState, GameStore
+from scheduling import schedule_once, cancel_tasks
+
+class WriteBehindPersister:
+    """Writes the dirty running games to the database in batches"""
+
+    def __init__(self, store: GameStore, executor=None, delay: float = 0.05, batch_size: int = 32) -> None:
+        self.store = store
+        #DatabaseExecutor that runs the writes, without one they run in the caller thread
+        self.executor = executor
+        self.delay = delay
+        self.batch_size = batch_size
+        self.dirty: set[int] = set()
+        #Loop where the writes are scheduled, set by start
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._writing: Optional[Future] = None
+        store.persister = self
+
+    def start(self) -> None:
+        """Writes the dirty games in background in the running loop until stop is called"""
+        self.loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        """Stops writing in background and writes the games still dirty"""
+        self.loop = None
+        await cancel_tasks(self._task)
+        self._task = None
+        await self.flush_async()
+
+    def mark_dirty(self, game_id: int) -> None:
+        self.dirty.add(game_id)
+        delay = 0 if len(self.dirty) >= self.batch_size else self.delay
+        self._task = schedule_once(self.loop, self._task, lambda: self._flush_later(delay))
+        if self._task is None:
+            #Not started, the write happens right away
+            self.flush()
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.flush_async()
+
+    def flush(self, game_id: Optional[int] = None) -> int:
+        """Persists the dirty games (or just the given one), returns how many were written"""
+        states = self._take(game_id)
+        if states:
+            with db_session:
+                write_game_states(states)
+        return len(states)
+
+    async def flush_async(self, game_id: Optional[int] = None) -> int:
+        """Like flush, but the writes run in the executor after the ones already running"""
+        if self.executor is None:
+            return self.flush(game_id)
+        if self._writing is not None and not self._writing.done():
+            await asyncio.wait([asyncio.wrap_future(self._writing)])
+        states = self._take(game_id)
+        if states:
+            self._writing = self.executor.submit(write_game_states, states)
+            await asyncio.wrap_future(self._writing)
+        return len(states)
+
+    def _take(self, game_id: Optional[int]) -> List[GameState]:
+        if game_id is None:
+            batch, self.dirty = self.dirty, set()
+        elif game_id in self.dirty:
+            self.dirty.discard(game_id)
+            batch = {game_id}
+        else:
+            return []
+        #The published snapshots are never modified, so they can be written from another thread
+        return [self.store.snapshots[g] for g in batch if g in self.store.snapshots]
+
+def write_game_states(states: List[GameState]) -> None:
+    for state in states:
+        write_game_state(state)
+
+def write_game_state(state: GameState) -> None:
+    """Copies the state of a game into its entities, must run inside a db_session"""
+    db_game = Game.get(id=state.id)
+    if db_game is None:
+        return
+    db_game.set(
+        current_turn=state.current_turn,
+        in_game=state.in_game,
+        is_done=state.is_done,
+        going_clockwise=state.going_clockwise,
+        number_of_players=state.number_of_players,
+        card_manifest=state.manifest,
+        deck_cards=bytes(state.deck),
+        discarded_cards=bytes(state.discarded),
+    )
+    for seat in state.players.values():
+        db_player = Player.get(id=seat.id)
+        if db_player is None:
+            #Left the game while the write was waiting
+            continue
+        db_player.set(
+            position=seat.position,
+            role=seat.role,
+            is_dead=seat.is_dead,
+            in_lockdown=seat.in_lockdown,
+            left_barrier=seat.left_barrier,
+            right_barrier=seat.right_barrier,
+            hand_cards=bytes(seat.hand),
+        )
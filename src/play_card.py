@@ -1,62 +1,34 @@
-from entities import Game, Player, Card
+from game_state import GameState, SeatState
+from card_catalog import CardType
 from enumerations import CardName, Kind
 from typing import List, Tuple
 
-def playable_card(db_card: Card, db_player: Player) -> bool:
+def playable_card(game: GameState, card_id: int, player: SeatState) -> bool:
     """Returns if the card is playable"""
     
-    return db_card.player.id == db_player.id and db_card.kind == Kind.ACTION
+    return card_id in player.hand and game.card(card_id).kind == Kind.ACTION
 
-def targeted_players(db_card: Card, db_player: Player) -> List[Player]:
+def targeted_players(game: GameState, card_id: int, player: SeatState) -> List[SeatState]:
     """Returns the players that can be targeted"""
-    if playable_card(db_card, db_player) == False:
+    if playable_card(game, card_id, player) == False:
         return []
     
-    match db_card.name:
-        case CardName.FLAMETHROWER:
-            return [
-                    p
-                    for p in db_player.game.players
-                    if p.id != db_player.id and not p.is_dead and
-                    (p.position == ((db_player.position + 1) % db_player.game.number_of_players) or
-                    p.position == ((db_player.position - 1) % db_player.game.number_of_players))
-                ]
+    ring = game.seat_ring()
+    me = 1 << player.position
+    match game.card(card_id).name:
+        case CardName.FLAMETHROWER | CardName.ANALYSIS:
+            mask = ring.neighbours_mask(player)
         case CardName.SWAP_PLACES:
-            return [
-                    p
-                    for p in db_player.game.players
-                    if p.id != db_player.id and not p.in_lockdown and not p.is_dead and
-                    (p.position == ((db_player.position + 1) % db_player.game.number_of_players and not p.left_barrier) or
-                    p.position == ((db_player.position - 1) % db_player.game.number_of_players and not p.right_barrier))
-                        
-            ]
+            mask = ring.reachable_mask(player)
         case CardName.AXE:
-            return [
-                    p
-                    for p in db_player.game.players
-                    if not p.is_dead and (p.in_lockdown or p.left_barrier or p.right_barrier) and 
-                    (p.position == db_player.position or
-                    p.position == ((db_player.position + 1) % db_player.game.number_of_players) or
-                    p.position == ((db_player.position - 1) % db_player.game.number_of_players))
-            ]
+            mask = (me | ring.neighbours_mask(player)) & (ring.lockdown | ring.left_barrier | ring.right_barrier)
         case CardName.SEDUCTION:
-            return [
-                    p
-                    for p in db_player.game.players
-                    if p.id != db_player.id and not p.in_lockdown and not p.is_dead
-            ]
-        case CardName.ANALYSIS:
-            return [
-                    p
-                    for p in db_player.game.players
-                    if p.id != db_player.id and not p.is_dead and
-                    p.position == ((db_player.position + 1) % db_player.game.number_of_players) or
-                    p.position == ((db_player.position - 1) % db_player.game.number_of_players)
-                ]            
+            mask = ring.alive & ~ring.lockdown & ~me
         case _:
-            return []
+            mask = 0
+    return ring.seats_in(mask)
 
-def implemented_card(card: Card) -> bool:
+def implemented_card(card: CardType) -> bool:
     """Return if a action card is implemented"""
     return ((card.name == CardName.FLAMETHROWER) or
         (card.name == CardName.ANALYSIS) or
@@ -68,65 +40,78 @@ def implemented_card(card: Card) -> bool:
         (card.name == CardName.SEDUCTION) or
         (card.name == CardName.YOU_BETTER_RUN))
 
-def play_flamethrower(game: Game, player_afected: Player) -> None:
+def apply_card(game: GameState, card_name: CardName, player: SeatState, player_afected: SeatState | None):
+    """Applies the effect of an action card, returns the message for the player if it has one"""
+    match card_name:
+        case CardName.FLAMETHROWER:
+            return play_flamethrower(game, player_afected)
+        case CardName.WATCH_YOUR_BACK:
+            return play_watch_your_back(game)
+        case CardName.SWAP_PLACES:
+            return play_swap_places(game, player, player_afected)
+        case CardName.YOU_BETTER_RUN:
+            return play_you_better_run(game, player, player_afected)
+        case CardName.SEDUCTION:
+            return play_change_cards(player, player_afected)
+        case CardName.ANALYSIS:
+            return show_cards_of_player(game, player_afected)
+        case CardName.WHISKY:
+            return show_cards_of_player(game, player)
+        case _:
+            return None
+
+def play_flamethrower(game: GameState, player_afected: SeatState) -> None:
     """Plays the flamethrower card"""
     
-    #Set dead status
-    player_afected.is_dead = True
+    #Set dead status, the seat is skipped by turns and neighbours
+    game.eliminate(player_afected)
     #Discard his hand
-    for c in player_afected.hand:
-        game.discarded.add(c)
-    player_afected.hand.clear()
-    #Reorganize the positions
-    living_players = [p for p in game.players if not p.is_dead]
-    living_players.sort(key=lambda x: x.position)
-    for (turn, player) in enumerate(living_players):
-        if player.position == game.current_turn:
-            game.current_turn = turn
-        player.position = turn
+    game.discarded.extend(player_afected.hand)
+    del player_afected.hand[:]
 
-def play_watch_your_back(game: Game) -> None:
+def play_watch_your_back(game: GameState) -> None:
     """Play the watch your back card""" 
     game.going_clockwise = not game.going_clockwise
 
-def play_swap_places(game: Game, player: Player, player_afected: Player):
-    if ((player_afected.position == (player.position + 1) % game.number_of_players and not player_afected.left_barrier 
-        and not player.in_lockdown) or 
-        (player_afected.position == (player.position - 1) % game.number_of_players and 
-        not player_afected.right_barrier and not player.in_lockdown)):
+def play_swap_places(game: GameState, player: SeatState, player_afected: SeatState):
+    ring = game.seat_ring()
+    if (not player.in_lockdown and player_afected in ring.neighbours(player) and
+        not ring.blocked(player, player_afected)):
         player.position, player_afected.position = player_afected.position, player.position
+        game.seating_changed()
 
-def swap_places(player: Player, player_afected: Player) -> dict:
+def swap_places(game: GameState, player: SeatState, player_afected: SeatState) -> dict:
     """Play all the place swap cards"""
     if player_afected.in_lockdown:
         player.position, player_afected.position = player_afected.position, player.position
-    return players_positions(player.game)
+        game.seating_changed()
+    return players_positions(game)
 
-def show_cards_of_player(player: Player) -> dict:
-    mensaje = hand_to_list(List(player.hand))
+def show_cards_of_player(game: GameState, player: SeatState) -> dict:
+    mensaje = game_hand_to_list(game, player.hand)
     return {"hand to player": mensaje}
 
-def play_you_better_run(player: Player, player_afected: Player) -> dict:
-    return swap_places(player, player_afected)
+def play_you_better_run(game: GameState, player: SeatState, player_afected: SeatState) -> dict:
+    return swap_places(game, player, player_afected)
 
-def play_change_cards(player: Player, player_afected: Player) -> None:
+def play_change_cards(player: SeatState, player_afected: SeatState) -> None:
     """Play all the card exchange cards"""
     pass
 
-def play_remove_obstacle(player_afected: Player) -> None:
+def play_remove_obstacle(player_afected: SeatState) -> None:
     """Plays all the remove obstacle card"""
     # player_afected.in_lockdown = False
     # player_afected.left_barrier = False
     # player_afected.right_barrier = False
     pass
 
-def play_suspicion(player_afected: Player) -> None:
+def play_suspicion(player_afected: SeatState) -> None:
     pass
 
-def hand_to_list(hand: List[Card]) -> List[Tuple[int, str]]:
-    """Converts a list of cards to a list of tuple int, strings"""
-    return [(c.id, c.name) for c in hand]
+def game_hand_to_list(game: GameState, hand) -> List[Tuple[int, str]]:
+    """Converts the card ids of a hand to a list of tuple int, strings"""
+    return [(c, game.card(c).name) for c in hand]
 
-def players_positions(game: Game) -> list[Tuple[int, str]]:
+def players_positions(game: GameState) -> list[Tuple[int, str]]:
     """Returns the positions of the players"""
-    return [(p.position, p.name) for p in list(game.players)]
+    return [(p.position, p.name) for p in game.seats()]
@@ -0,0 +1,19 @@
+import asyncio
+from typing import Any, Callable, Coroutine, Optional
+
+def schedule_once(loop: Optional[asyncio.AbstractEventLoop], task: Optional[asyncio.Task],
+                  start: Callable[[], Coroutine[Any, Any, Any]]) -> Optional[asyncio.Task]:
+    """Starts the coroutine in the loop unless the task is still pending.
+    Returns the task that is pending afterwards, None when there is no loop (the component is not started)"""
+    if loop is None:
+        return None
+    if task is not None and not task.done():
+        return task
+    return loop.create_task(start())
+
+async def cancel_tasks(*tasks: Optional[asyncio.Task]) -> None:
+    """Cancels the tasks and waits until they finished"""
+    pending = [task for task in tasks if task is not None and not task.done()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
@@ -76,6 +76,7 @@ class GameInDB(BaseModel):
     min_players: int
     max_players: int
     number_of_players: int
+    version: int = 0
 
 class CardOut(BaseModel):
     """Card information"""
@@ -0,0 +1,195 @@
+"""Headless La Cosa engine, it plays whole games with the rules of game_rules and play_card
+without the API, websockets or the database (it never imports the entities).
+
+    $ python simulator.py --games 1000 --players 6 --agent heuristic --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Type
+from game_state import GameState, SeatState
+from enumerations import CardName, Kind, Role
+import play_card as card_actions
+import game_rules
+
+#Action cards that do not need a target
+UNTARGETED = (CardName.WATCH_YOUR_BACK, CardName.WHISKY)
+
+class Agent(ABC):
+    """Decides the moves of one player, subclasses only choose among valid moves"""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+
+    @abstractmethod
+    def choose_play(self, game: GameState, seat: SeatState,
+                    plays: List[Tuple[int, Optional[SeatState]]]) -> Optional[Tuple[int, Optional[SeatState]]]:
+        """Returns the (card, target) to play, None to discard instead"""
+
+    @abstractmethod
+    def choose_discard(self, game: GameState, seat: SeatState, cards: List[int]) -> int:
+        """Returns the card to discard"""
+
+    @abstractmethod
+    def choose_exchange(self, game: GameState, seat: SeatState, partner: SeatState, cards: List[int]) -> int:
+        """Returns the card to give to the partner"""
+
+class RandomAgent(Agent):
+    """Plays half of the time and picks every card at random"""
+
+    def choose_play(self, game, seat, plays):
+        return self.rng.choice(plays) if plays and self.rng.random() < 0.5 else None
+
+    def choose_discard(self, game, seat, cards):
+        return self.rng.choice(cards)
+
+    def choose_exchange(self, game, seat, partner, cards):
+        return self.rng.choice(cards)
+
+class HeuristicAgent(Agent):
+    """Burns the players of the other side, the Thing infects every human it can"""
+
+    def choose_play(self, game, seat, plays):
+        for card, target in plays:
+            if game.card(card).name == CardName.FLAMETHROWER and is_enemy(seat, target):
+                return card, target
+        others = [(card, target) for card, target in plays if game.card(card).name != CardName.FLAMETHROWER]
+        return self.rng.choice(others) if others else None
+
+    def choose_discard(self, game, seat, cards):
+        keep = {CardName.FLAMETHROWER, CardName.INFECTED}
+        return min(cards, key=lambda c: (game.card(c).name in keep, self.rng.random()))
+
+    def choose_exchange(self, game, seat, partner, cards):
+        if seat.role == Role.THING and partner.role == Role.HUMAN:
+            infected = [c for c in cards if game.card(c).name == CardName.INFECTED]
+            if infected:
+                return infected[0]
+        return self.choose_discard(game, seat, [c for c in cards if game.card(c).name != CardName.INFECTED] or cards)
+
+AGENTS: Dict[str, Type[Agent]] = {"random": RandomAgent, "heuristic": HeuristicAgent}
+
+def is_enemy(seat: SeatState, other: SeatState) -> bool:
+    return (seat.role == Role.HUMAN) != (other.role == Role.HUMAN)
+
+def new_game(num_of_players: int, seed: int) -> GameState:
+    """Seats the players and deals the cards like start_game"""
+    game = GameState(0, f"Simulation {seed}", host=1)
+    game.number_of_players = num_of_players
+    game.rng = random.Random(seed)
+    for num in range(num_of_players):
+        game.players[num + 1] = SeatState(num + 1, f"Player {num}", position=num)
+    game_rules.create_deck(game)
+    game_rules.deal_cards(game)
+    return game
+
+def valid_plays(game: GameState, seat: SeatState) -> List[Tuple[int, Optional[SeatState]]]:
+    """Action cards of the hand with each of their targets"""
+    plays = []
+    for card in dict.fromkeys(seat.hand):
+        card_type = game.card(card)
+        if card_type.kind != Kind.ACTION:
+            continue
+        if card_type.name in UNTARGETED:
+            plays.append((card, None))
+        else:
+            plays.extend((card, target) for target in card_actions.targeted_players(game, card, seat))
+    return plays
+
+def can_give(game: GameState, seat: SeatState, card: int) -> bool:
+    name = game.card(card).name
+    return name != CardName.THE_THING and (name != CardName.INFECTED or seat.role == Role.THING)
+
+def play_turn(game: GameState, agents: Dict[int, Agent]) -> int:
+    """Plays the turn of the current player, returns how many actions it took"""
+    seat = game.seat_at(game.current_turn)
+    agent = agents[seat.id]
+    game_rules.draw_card(game, seat)
+    actions = 1
+
+    play = agent.choose_play(game, seat, valid_plays(game, seat))
+    if play is not None:
+        card, target = play
+        card_actions.apply_card(game, game.card(card).name, seat, target)
+        game_rules.discard_card(game, seat, card)
+    else:
+        discardable = [c for c in seat.hand if game.card(c).name != CardName.THE_THING]
+        game_rules.discard_card(game, seat, agent.choose_discard(game, seat, discardable))
+    actions += 1
+    if game.is_over():
+        return actions
+
+    partner = game.seat_ring().neighbour(seat, game.going_clockwise)
+    if partner is not seat and not partner.in_lockdown and not seat.in_lockdown:
+        cards1 = [c for c in seat.hand if can_give(game, seat, c)]
+        cards2 = [c for c in partner.hand if can_give(game, partner, c)]
+        if cards1 and cards2:
+            card1 = agent.choose_exchange(game, seat, partner, cards1)
+            card2 = agents[partner.id].choose_exchange(game, partner, seat, cards2)
+            game_rules.exchange_card(game, seat, partner, card1, card2)
+            actions += 1
+    game_rules.change_turn(game)
+    return actions
+
+def outcome(game: GameState) -> str:
+    if not game.is_over():
+        return "unfinished"
+    return game_rules.get_winners(game)["message"]
+
+def simulate_game(seed: int, num_of_players: int = 6, agent: str = "random", max_turns: int = 1000) -> dict:
+    """Plays a whole game, it is reproducible from the seed"""
+    game = new_game(num_of_players, seed)
+    agent_rng = random.Random(seed ^ 0x5EED)
+    agents = {player_id: AGENTS[agent](agent_rng) for player_id in game.players}
+    turns = actions = 0
+    while not game.is_over() and turns < max_turns:
+        actions += play_turn(game, agents)
+        turns += 1
+    return {"seed": seed, "turns": turns, "actions": actions, "outcome": outcome(game)}
+
+def _simulate_chunk(args: Tuple[List[int], int, str, int]) -> List[dict]:
+    seeds, num_of_players, agent, max_turns = args
+    return [simulate_game(seed, num_of_players, agent, max_turns) for seed in seeds]
+
+def run_simulations(games: int, num_of_players: int = 6, agent: str = "random", workers: Optional[int] = None,
+                    seed: int = 0, max_turns: int = 1000, chunk: int = 64) -> dict:
+    """Plays the games in a pool of processes and summarizes them"""
+    seeds = list(range(seed, seed + games))
+    chunks = [(seeds[i:i + chunk], num_of_players, agent, max_turns) for i in range(0, games, chunk)]
+    start = time.perf_counter()
+    if workers == 1:
+        results = [r for c in chunks for r in _simulate_chunk(c)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [r for rs in pool.map(_simulate_chunk, chunks) for r in rs]
+    elapsed = time.perf_counter() - start
+    actions = sum(r["actions"] for r in results)
+    turns = sum(r["turns"] for r in results)
+    return {
+        "games": games,
+        "players": num_of_players,
+        "agent": agent,
+        "workers": workers or os.cpu_count(),
+        "seconds": round(elapsed, 3),
+        "games_per_second": round(games / elapsed, 1) if elapsed else None,
+        "actions_per_second": round(actions / elapsed, 1) if elapsed else None,
+        "mean_turns": round(turns / games, 2) if games else 0,
+        "outcomes": dict(Counter(r["outcome"] for r in results)),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays La Cosa games without the server")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="random")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=1000)
+    args = parser.parse_args()
+    report = run_simulations(args.games, args.players, args.agent, args.workers, args.seed, args.max_turns)
+    print(json.dumps(report, indent=2))
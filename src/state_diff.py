@@ -0,0 +1,66 @@
+import json
+from typing import Optional
+from game_state import GameState
+
+GAME_FIELDS = ("current_turn", "going_clockwise", "in_game", "is_done", "number_of_players")
+SEAT_FIELDS = ("position", "role", "is_dead", "in_lockdown", "left_barrier", "right_barrier")
+
+class GameView:
+    """Values of a game already sent to the clients, the base of the next delta"""
+    __slots__ = ("version", "fields", "seats", "hands")
+
+    def __init__(self, game: GameState) -> None:
+        self.version = game.version
+        self.fields = tuple(getattr(game, f) for f in GAME_FIELDS)
+        self.seats = {s.id: tuple(getattr(s, f) for f in SEAT_FIELDS) for s in game.players.values()}
+        self.hands = {s.id: frozenset(s.hand) for s in game.players.values()}
+
+def diff_views(game: GameState, old: GameView, new: GameView) -> dict:
+    """Returns only the fields that changed between two views"""
+    delta = {
+        "event": "game_delta",
+        "game_id": game.id,
+        "base": old.version,
+        "version": new.version,
+    }
+    fields = {f: v for f, o, v in zip(GAME_FIELDS, old.fields, new.fields) if o != v}
+    if fields:
+        delta["game"] = fields
+    players = {}
+    for player_id, seat in new.seats.items():
+        old_seat = old.seats.get(player_id, (None,) * len(SEAT_FIELDS))
+        changes = {f: v for f, o, v in zip(SEAT_FIELDS, old_seat, seat) if o != v}
+        old_hand = old.hands.get(player_id, frozenset())
+        added = new.hands[player_id] - old_hand
+        removed = old_hand - new.hands[player_id]
+        if added:
+            changes["card_added"] = [(c, game.card(c).name) for c in sorted(added)]
+        if removed:
+            changes["card_removed"] = sorted(removed)
+        if changes:
+            players[player_id] = changes
+    if players:
+        delta["players"] = players
+    return delta
+
+def game_state_2_delta_json(game: GameState) -> str:
+    """Serializes what changed since the last delta of the game and moves the base forward"""
+    if game.delta is not None and game.delta[0] == game.version:
+        return game.delta[1]
+    new = GameView(game)
+    if game.view is None:
+        payload = json.dumps({"event": "game_resync", "game_id": game.id, "version": game.version})
+    else:
+        payload = json.dumps(diff_views(game, game.view, new))
+    game.view = new
+    game.delta = (game.version, payload)
+    return payload
+
+def reset_view(game: GameState) -> None:
+    """Takes the current state as the base of the next delta, used after a full snapshot"""
+    game.view = GameView(game)
+    game.delta = None
+
+def is_stale(game: GameState, version: Optional[int]) -> bool:
+    """Returns if a client with the given version has to resync"""
+    return version is None or version != game.version
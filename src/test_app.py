@@ -6,12 +6,19 @@ from config import databasename
 from test_fixture import game_params, game 
 from enumerations import Role
 from entities import Player, Game
-from all_utils.play_card import play_flamethrower, play_watch_your_back, play_swap_places
+from play_card import play_flamethrower, play_watch_your_back, play_swap_places
+from loaders import db_game_2_game_state
 import utils
 
 client = TestClient(app)
 databasename = "test.sqlite"
 
+@pytest.fixture(autouse=True)
+def running_app():
+    #Each test runs between the startup and the shutdown of the app, like under uvicorn
+    with client:
+        yield
+
 @pytest.mark.integration_test
 def test_retrieve_availables_games_empty():
     """Tests that the endpoint returns an empty list when there are no games available.
@@ -22,6 +29,29 @@ def test_retrieve_availables_games_empty():
     assert response.json() == []
 
 
+@pytest.mark.integration_test
+def test_retrieve_availables_games_not_modified():
+    """Tests that the full list of games is only sent again after it changed.
+    Fails if the same version is not answered with 304 or a stale one is not answered with the list."""
+
+    response = client.get("/join")
+    etag = response.headers["etag"]
+    assert client.get("/join", headers={"If-None-Match": etag}).status_code == 304
+    response = client.get("/join", headers={"If-None-Match": '"-1"'})
+    assert response.status_code == 200
+    assert response.headers["etag"] == etag
+    assert response.json() == []
+
+@pytest.mark.integration_test
+@pytest.mark.parametrize("query", ["offset=-1", "limit=-1", "limit=0", "free_seats=-2"])
+def test_retrieve_availables_games_invalid_page(query):
+    """Tests that the page and filters of the list of games are validated.
+    Fails if the status code is not 422."""
+
+    response = client.get(f"/join?{query}")
+    assert response.status_code == 422
+
+
 @pytest.mark.integration_test
 def test_create_game_success():
     """Tests a create game success scenario.
@@ -303,25 +333,24 @@ def game():
                 host=p1,
                 current_turn=0,
                 players=[p1, p2],
-                discarded = [],
                 number_of_players=2)
         return g
 
 @pytest.mark.card_test
 def test_Lanzallamas(game):
     with db_session:
-        game_afected = select(g for g in Game if g.id == game.id).first()
-        player1 = game.players.select(lambda p: p.name == "Player 1").first()
-        player2 = game.players.select(lambda p: p.name == "Player 2").first()
+        game_afected = db_game_2_game_state(select(g for g in Game if g.id == game.id).first())
+        player1 = next(p for p in game_afected.players.values() if p.name == "Player 1")
+        player2 = next(p for p in game_afected.players.values() if p.name == "Player 2")
         prev_pos = player1.position
         play_flamethrower(game_afected, player2)
         assert player2.is_dead == True
-        assert player1.position == 0
+        assert player1.position == prev_pos
 
 @pytest.mark.card_test
 def test_watch_your_back(game):
     with db_session:
-        game_afected = select(g for g in Game if g.id == game.id).first()
+        game_afected = db_game_2_game_state(select(g for g in Game if g.id == game.id).first())
         sentido = game_afected.going_clockwise
         play_watch_your_back(game_afected)
         nuevo_sentido = game_afected.going_clockwise
@@ -330,11 +359,46 @@ def test_watch_your_back(game):
 @pytest.mark.card_test
 def test_swap_places(game):
     with db_session:
-        game_afected = select(g for g in Game if g.id == game.id).first()
-        player1 = game.players.select(lambda p: p.position == 1).first()
-        player2 = game.players.select(lambda p: p.position == 0).first()
+        game_afected = db_game_2_game_state(select(g for g in Game if g.id == game.id).first())
+        player1 = game_afected.seat_at(1)
+        player2 = game_afected.seat_at(0)
         prev_posP1 = player1.position
         prev_posP2 = player2.position
-        play_swap_places(game, player1, player2)
+        play_swap_places(game_afected, player1, player2)
         assert player1.position == prev_posP2
-        assert player2.position == prev_posP1
\ No newline at end of file
+        assert player2.position == prev_posP1
+
+@pytest.mark.integration_test
+def test_deal_seed_comes_from_the_server(monkeypatch):
+    """Tests that only the server configuration makes the seating and the deal reproducible.
+    Fails if two games share a sequence without a configured seed or differ with one."""
+
+    import hello
+    import config
+    monkeypatch.setattr(config, "deal_seed", None)
+    assert hello.new_game_rng(1).random() != hello.new_game_rng(1).random()
+    monkeypatch.setattr(config, "deal_seed", 7)
+    assert hello.new_game_rng(1).random() == hello.new_game_rng(1).random()
+    assert hello.new_game_rng(1).random() != hello.new_game_rng(2).random()
+
+@pytest.mark.integration_test
+def test_migrate_adds_the_card_columns(tmp_path):
+    """Tests that a database of an older version gets the columns of the cards.
+    Fails if a column is missing or migrating twice fails."""
+
+    import sqlite3
+    from pony.orm import Database
+    from entities import migrate, ADDED_COLUMNS
+    path = str(tmp_path / "old.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE "Game" ("id" INTEGER PRIMARY KEY, "name" TEXT)')
+    connection.execute('CREATE TABLE "Player" ("id" INTEGER PRIMARY KEY, "name" TEXT)')
+    connection.commit()
+    old = Database()
+    old.bind("sqlite", path)
+    migrate(old)
+    migrate(old)
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')}
+        assert set(columns) <= existing
+    connection.close()
@@ -0,0 +1,13 @@
+import pytest
+from enumerations import CardName
+import card_catalog
+
+@pytest.mark.catalog_test
+def test_deck_manifest_follows_card_table():
+    """Tests that the manifest has one entry per physical card of the table for the number of players.
+    Fails if the count differs, La Cosa is not the first card or the manifest is built twice."""
+
+    manifest = card_catalog.deck_manifest(4)
+    assert len(manifest) == sum(card_catalog.get_card_deck(4)[:len(card_catalog.CATALOG)])
+    assert card_catalog.CATALOG[manifest[0]].name == CardName.THE_THING
+    assert card_catalog.deck_manifest(4) is manifest
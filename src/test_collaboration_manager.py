@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from CollaborationManager import CollaborationManager
+from enumerations import ExchangeState
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.mark.exchange_test
+def test_exchange_states():
+    """Tests the states an exchange goes through until it is resolved.
+    Fails if a state is wrong or a resolved exchange can be read again."""
+
+    manager = CollaborationManager(ttl=10)
+    session = manager.add_first_collaboration(1, {"player": 1, "card": 3}, invited=2)
+    assert session.state == ExchangeState.INVITED
+    manager.add_second_collaboration(1, {"player": 2, "card": 5})
+    assert session.state == ExchangeState.ACCEPTED
+    assert manager.get_data(1) == ({"player": 1, "card": 3}, {"player": 2, "card": 5})
+    assert session.state == ExchangeState.RESOLVED
+    assert manager.get_just_p1_data(1) is None
+
+@pytest.mark.exchange_test
+def test_exchange_expires_after_ttl():
+    """Tests that an exchange expires after its ttl and the others do not.
+    Fails if it is still open, its callback is not called or another exchange expired."""
+
+    clock = FakeClock()
+    expired = []
+    manager = CollaborationManager(ttl=10, clock=clock, on_expire=expired.append)
+    session = manager.add_first_collaboration(1, {"player": 1, "card": 3})
+    manager.add_first_collaboration(2, {"player": 4, "card": 7}, ttl=30)
+    clock.now = 11
+    assert manager.get_session(1) is None
+    assert session.state == ExchangeState.EXPIRED and expired == [session]
+    assert manager.get_session(2) is not None
+
+@pytest.mark.exchange_test
+def test_scheduler_expires_without_lookups():
+    """Tests that the scheduler expires the exchanges nobody looks up, also the ones opened before it started.
+    Fails if a session or deadline is left after every ttl ran out."""
+
+    async def scenario():
+        manager = CollaborationManager(ttl=0.05)
+        manager.add_first_collaboration(1, {"player": 1, "card": 3})
+        manager.start()
+        manager.add_first_collaboration(2, {"player": 4, "card": 7}, ttl=0.01)
+        await asyncio.sleep(0.1)
+        await manager.stop()
+        return manager
+
+    manager = asyncio.run(scenario())
+    assert not manager.sessions and not manager.deadlines
+
+@pytest.mark.exchange_test
+def test_cap_evicts_least_recently_used():
+    """Tests that past the cap the least recently used exchanges are evicted.
+    Fails if a recently used exchange is evicted or the deadlines grow without bound."""
+
+    manager = CollaborationManager(ttl=10, max_sessions=2)
+    first = manager.add_first_collaboration(1, {"player": 1, "card": 0})
+    manager.add_first_collaboration(2, {"player": 2, "card": 0})
+    manager.get_session(1)
+    manager.add_first_collaboration(3, {"player": 3, "card": 0})
+    assert list(manager.sessions) == [1, 3]
+    for game_id in range(4, 20):
+        manager.add_first_collaboration(game_id, {"player": game_id, "card": 0})
+    assert len(manager.sessions) == 2 and len(manager.deadlines) <= 4
+    assert first.state == ExchangeState.EXPIRED
+
+@pytest.mark.exchange_test
+def test_cleanup_on_leave():
+    """Tests that a player leaving drops the exchange it was part of.
+    Fails if the exchange of other players is dropped or its own is kept."""
+
+    manager = CollaborationManager()
+    manager.add_first_collaboration(1, {"player": 1, "card": 0}, invited=2)
+    manager.remove_player(1, 3)
+    assert manager.get_session(1) is not None
+    manager.remove_player(1, 2)
+    assert manager.get_session(1) is None
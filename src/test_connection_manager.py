@@ -0,0 +1,168 @@
+import asyncio
+import pytest
+from connection_manager import ConnectionManager
+from backplane import Backplane, InProcessBackplane
+from enumerations import SlowConsumerPolicy
+
+class FakeWebSocket:
+    """Websocket double that records the messages sent to it"""
+
+    def __init__(self, delay: float = 0) -> None:
+        self.delay = delay
+        self.sent = []
+        self.closed = False
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, message: str) -> None:
+        await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.closed = True
+
+@pytest.mark.connection_test
+def test_broadcast_does_not_wait_for_slow_clients():
+    """Tests that a broadcast only enqueues the message for each client.
+    Fails if it waits for a slow client or the fast one does not get the message."""
+
+    async def scenario():
+        manager = ConnectionManager(queue_size=8)
+        slow, fast = FakeWebSocket(delay=10), FakeWebSocket()
+        await manager.connect(1, slow)
+        await manager.connect(1, fast)
+        await asyncio.wait_for(manager.broadcast(1, "hello"), timeout=0.1)
+        await asyncio.sleep(0.01)
+        return fast.sent, slow.sent
+
+    fast_sent, slow_sent = asyncio.run(scenario())
+    assert fast_sent == ["hello"]
+    assert slow_sent == []
+
+@pytest.mark.connection_test
+@pytest.mark.parametrize("policy, expected", [
+    (SlowConsumerPolicy.DROP, ["m0", "m1", "m2"]),
+    (SlowConsumerPolicy.DROP_OLDEST, ["m0", "m3", "m4"]),
+])
+def test_slow_consumer_policy(policy, expected):
+    """Tests what a full outbound queue keeps under each slow consumer policy.
+    Fails if the messages delivered are not the ones the policy keeps."""
+
+    async def scenario():
+        manager = ConnectionManager(queue_size=2, policy=policy)
+        websocket = FakeWebSocket(delay=0.01)
+        await manager.connect(1, websocket)
+        await asyncio.sleep(0)
+        for num in range(5):
+            await manager.broadcast(1, f"m{num}")
+            if num == 0:
+                await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        return websocket.sent
+
+    assert asyncio.run(scenario()) == expected
+
+@pytest.mark.connection_test
+def test_slow_consumer_disconnected():
+    """Tests that a client that can not keep up is disconnected under the disconnect policy.
+    Fails if the websocket is not closed or stays in its group."""
+
+    async def scenario():
+        manager = ConnectionManager(queue_size=1, policy=SlowConsumerPolicy.DISCONNECT)
+        websocket = FakeWebSocket(delay=1)
+        await manager.connect(1, websocket)
+        for num in range(3):
+            await manager.broadcast(1, f"m{num}")
+        await asyncio.sleep(0.01)
+        return manager, websocket
+
+    manager, websocket = asyncio.run(scenario())
+    assert websocket.closed
+    assert websocket not in manager.active_connections[1]
+
+@pytest.mark.connection_test
+def test_registry_indexes_connections():
+    """Tests the indexes of connections by group, player and socket.
+    Fails if a move, identification or removal leaves an index out of date."""
+
+    async def scenario():
+        manager = ConnectionManager()
+        host, guest, menu = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        for websocket in (host, guest, menu):
+            await manager.connect(0, websocket)
+        await manager.move_connection(0, 7, host)
+        await manager.move_connection(0, 7, guest)
+        await manager.set_websocket(7, 1, host)
+        await manager.set_websocket(7, 2, guest)
+        assert manager.get_websocket(7, 2) is guest
+        assert manager.active_connections[7] == {host, guest}
+
+        await manager.remove_all_connection_of_game(7)
+        assert 7 not in manager.active_connections
+        assert manager.active_connections[0] == {host, guest, menu}
+        assert manager.connection_players == {} and manager.player_connections == {}
+        with pytest.raises(Exception):
+            manager.get_websocket(7, 1)
+
+        manager.disconnect(0, menu)
+        assert manager.active_connections[0] == {host, guest}
+
+    asyncio.run(scenario())
+
+@pytest.mark.connection_test
+def test_route_by_token():
+    """Tests that a token moves its connection to the game and identifies it.
+    Fails if the connection is not in the game, an unknown token is routed or the token outlives the connection."""
+
+    async def scenario():
+        manager = ConnectionManager()
+        first, second = FakeWebSocket(), FakeWebSocket()
+        tokens = [await manager.connect(0, first), await manager.connect(0, second)]
+        assert tokens[0] != tokens[1]
+        assert await manager.route(tokens[1], 5, 7)
+        assert not await manager.route("unknown", 5, 8)
+        await manager.broadcast(5, "game")
+        await asyncio.sleep(0.01)
+        manager.drop_connection(second)
+        return first.sent, second.sent, manager
+
+    first_sent, second_sent, manager = asyncio.run(scenario())
+    assert first_sent == [] and second_sent == ["game"]
+    assert len(manager.tokens) == 1 and not manager.player_connections
+
+@pytest.mark.connection_test
+def test_backplane_must_implement_publish():
+    """Tests that a backplane without publish can not be built.
+    Fails if the base class can be instantiated."""
+
+    with pytest.raises(TypeError):
+        Backplane()
+
+class RecordingBackplane(InProcessBackplane):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, channel, data):
+        self.published.append((channel, data))
+        super().publish(channel, data)
+
+@pytest.mark.connection_test
+def test_broadcasts_go_through_the_backplane():
+    """Tests that a broadcast is published on the backplane and delivered by its subscriber.
+    Fails if the manager delivers without publishing or a connection of another group gets it."""
+
+    async def scenario():
+        backplane = RecordingBackplane()
+        manager = ConnectionManager(backplane=backplane)
+        sockets = [FakeWebSocket(), FakeWebSocket()]
+        await manager.connect(1, sockets[0])
+        await manager.connect(2, sockets[1])
+        await manager.broadcast(1, "hello")
+        await asyncio.sleep(0.01)
+        return backplane.published, [websocket.sent for websocket in sockets]
+
+    published, sent = asyncio.run(scenario())
+    assert published == [("broadcast", (1, "hello"))]
+    assert sent == [["hello"], []]
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import pytest
+from entities import Game
+from db_executor import DatabaseExecutor
+from test_fixture import started_game
+
+@pytest.mark.executor_test
+def test_executor_runs_units_off_the_loop(started_game):
+    """Tests that the units of work run in the pool, each in its own db_session.
+    Fails if a unit runs in the thread of the event loop or a failed unit is not rolled back."""
+
+    database = DatabaseExecutor(max_workers=2)
+    loop_thread = threading.get_ident()
+
+    def read():
+        return threading.get_ident(), Game[started_game].number_of_players
+
+    def fail():
+        Game[started_game].number_of_players = 0
+        raise ValueError()
+
+    async def run():
+        with pytest.raises(ValueError):
+            await database.run(fail)
+        return await asyncio.gather(*(database.run(read) for _ in range(4)))
+
+    results = asyncio.run(run())
+    assert all(thread != loop_thread for thread, _ in results)
+    #The failed unit of work was rolled back
+    assert all(players == 4 for _, players in results)
+    database.shutdown()
+
+@pytest.mark.executor_test
+def test_executor_runs_again_after_shutdown(started_game):
+    """Tests that the executor takes units of work again after a shutdown, like the app after a restart.
+    Fails if a unit submitted after the shutdown is rejected."""
+
+    database = DatabaseExecutor(max_workers=1)
+
+    def read():
+        return Game[started_game].number_of_players
+
+    assert asyncio.run(database.run(read)) == 4
+    database.shutdown()
+    assert asyncio.run(database.run(read)) == 4
+    database.shutdown()
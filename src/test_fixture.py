@@ -1,6 +1,12 @@
+import random
 import pytest
-from pony.orm import db_session
+from pony.orm import db_session, flush
 from entities import Game, Player
+from game_state import GameStore, GameState, SeatState
+from loaders import db_game_2_game_state, read_game_state
+from persistence import write_game_state
+from enumerations import CardName
+import game_rules
 
 # Fixture para crear un juego
 @pytest.fixture
@@ -45,3 +51,54 @@ game_params = [
     }
 ]
 
+# Fixture para crear una partida empezada de cuatro jugadores, devuelve su id
+@pytest.fixture
+def started_game():
+    with db_session:
+        host = Player(name="Host")
+        flush()
+        game = Game(name="State game", host=host, players=[host])
+        for num in range(1, 4):
+            game.players.add(Player(name=f"Player {num}", position=num))
+        game.number_of_players = 4
+        game.in_game = True
+        flush()
+        state = db_game_2_game_state(game)
+        game_rules.create_deck(state)
+        game_rules.deal_cards(state)
+        write_game_state(state)
+        return game.id
+
+def loaded_store(id_game: int) -> GameStore:
+    """Store with the game already in memory"""
+    store = GameStore()
+    with db_session:
+        store.register(read_game_state(id_game))
+    return store
+
+def dealt_game(num_of_players: int, seed: int) -> GameState:
+    """Running game only in memory, with the cards dealt"""
+    game = GameState(1, "Deal", host=1)
+    game.number_of_players = num_of_players
+    for num in range(num_of_players):
+        game.players[num + 1] = SeatState(num + 1, f"Player {num}", position=num)
+    game.rng = random.Random(seed)
+    game_rules.create_deck(game)
+    game_rules.deal_cards(game)
+    return game
+
+def create_db_game(num_of_players: int) -> int:
+    """Game in the lobby with the given number of players, returns its id"""
+    with db_session:
+        host = Player(name="Host")
+        flush()
+        game = Game(name=f"Loader game {num_of_players}", host=host, players=[host],
+                    number_of_players=num_of_players)
+        for num in range(1, num_of_players):
+            game.players.add(Player(name=f"Player {num}", position=num))
+        flush()
+        return game.id
+
+def card_named(game: GameState, name: CardName) -> int:
+    """Id of the first card of the game with the name"""
+    return next(c for c in range(len(game.manifest)) if game.card(c).name == name)
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from game_actors import GameActors
+
+@pytest.mark.actor_test
+def test_game_actions_are_serialized():
+    """Tests that the actions of a game run one after another and other games do not wait for them.
+    Fails if two actions of a game overlap, a failure stops the mailbox or a mailbox is left behind."""
+
+    actors = GameActors()
+    log = []
+
+    async def action(game_id, num, fail=False):
+        log.append(("start", game_id, num))
+        await asyncio.sleep(0.01)
+        log.append(("end", game_id, num))
+        if fail:
+            raise ValueError()
+        return num
+
+    async def run():
+        actors.start()
+        results = await asyncio.gather(
+            actors.submit(1, lambda: action(1, 0)),
+            actors.submit(1, lambda: action(1, 1, fail=True)),
+            actors.submit(2, lambda: action(2, 0)),
+            actors.submit(1, lambda: action(1, 2)),
+            return_exceptions=True,
+        )
+        await actors.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert results[0] == 0 and isinstance(results[1], ValueError) and results[2:] == [0, 2]
+    game1 = [entry for entry in log if entry[1] == 1]
+    assert game1 == [(step, 1, num) for num in range(3) for step in ("start", "end")]
+    #The other game did not wait for the first one
+    assert log.index(("start", 2, 0)) < log.index(("end", 1, 0))
+    assert not actors.mailboxes and not actors.workers
+
+@pytest.mark.actor_test
+def test_stop_cancels_the_actions():
+    """Tests that stopping the actors cancels the running and the queued actions of every game.
+    Fails if an action runs after the stop, a caller keeps waiting or a worker is left behind."""
+
+    actors = GameActors()
+    started = []
+
+    async def action(num):
+        started.append(num)
+        await asyncio.sleep(10)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await actors.submit(1, lambda: action(0))
+        actors.start()
+        calls = [asyncio.create_task(actors.submit(1, lambda num=num: action(num))) for num in range(2)]
+        await asyncio.sleep(0.01)
+        await actors.stop()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(run())
+    assert started == [0]
+    assert not actors.mailboxes and not actors.workers
@@ -0,0 +1,46 @@
+import pytest
+from enumerations import CardName, Kind, Role
+from test_fixture import dealt_game
+import game_rules
+
+@pytest.mark.rules_test
+@pytest.mark.parametrize("num_of_players", [4, 8, 12])
+def test_deal_cards(num_of_players):
+    """Tests that every player gets four dealable cards and exactly one gets La Cosa.
+    Fails if a card is lost or duplicated, a hand has another size or there is not one Thing."""
+
+    game = dealt_game(num_of_players, seed=7)
+    hands = [seat.hand for seat in game.seats()]
+    dealt = [card for hand in hands for card in hand]
+    assert all(len(hand) == 4 for hand in hands)
+    assert sorted(dealt + list(game.deck)) == list(range(len(game.manifest)))
+    things = [s for s in game.players.values() if s.role == Role.THING]
+    assert len(things) == 1
+    assert [game.card(c).name for c in dealt].count(CardName.THE_THING) == 1
+    assert all(game.card(c).kind in (Kind.ACTION, Kind.DEFENSE, Kind.THETHING) for c in dealt)
+
+@pytest.mark.rules_test
+def test_seeded_deal_is_reproducible():
+    """Tests that the same seed deals the same hands and deck.
+    Fails if two deals with the same seed differ."""
+
+    first, second = dealt_game(6, seed=42), dealt_game(6, seed=42)
+    assert [s.hand for s in first.seats()] == [s.hand for s in second.seats()]
+    assert first.deck == second.deck
+
+@pytest.mark.rules_test
+def test_draw_pile_order_and_reshuffle():
+    """Tests that cards are drawn from the top of the deck and the discard pile is reshuffled when it runs out.
+    Fails if the draw order is not the deck order or a discarded card is lost."""
+
+    game = dealt_game(4, seed=3)
+    seat = game.seat_at(0)
+    top = list(reversed(game.deck))[:3]
+    assert [game_rules.draw_card(game, seat) for _ in range(3)] == top
+
+    game.discarded.extend(game.deck)
+    del game.deck[:]
+    discarded = sorted(game.discarded)
+    card = game_rules.draw_card(game, seat)
+    assert sorted(list(game.deck) + [card]) == discarded
+    assert len(game.discarded) == 0
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from game_state import GameStore
+from loaders import read_game_state
+from db_executor import DatabaseExecutor
+from enumerations import Role
+from test_fixture import started_game, loaded_store, dealt_game
+import utils
+import game_rules
+import play_card as card_actions
+
+@pytest.mark.state_test
+def test_load_game_state(started_game):
+    """Tests that a running game missing from memory is loaded through the loader of the store.
+    Fails if the store queries by itself, or the seats, hands or deck are not loaded."""
+
+    database = DatabaseExecutor(max_workers=1)
+    store = GameStore(loader=lambda game_id: database.run(read_game_state, game_id))
+    assert store.get(started_game) is None and store.snapshot(started_game) is None
+    state = asyncio.run(store.load(started_game))
+    database.shutdown()
+    assert store.get(started_game) is state
+    assert state.number_of_players == 4
+    assert all(len(seat.hand) == 4 for seat in state.players.values())
+    assert len(state.deck) + 16 == len(state.manifest)
+    assert store.get_by_player(state.host) is state
+
+@pytest.mark.state_test
+def test_snapshot_encoded_once_per_version(started_game):
+    """Tests that the snapshot of a game is serialized once per version.
+    Fails if the same version is encoded twice or a new one reuses the old payload."""
+
+    store = loaded_store(started_game)
+    state = store.get(started_game)
+    payload = utils.game_state_2_json(state)
+    assert utils.game_state_2_json(state) is payload
+    game_rules.draw_card(state, state.seat_at(0))
+    store.commit(state)
+    assert utils.game_state_2_json(state) is not payload
+
+@pytest.mark.state_test
+def test_readers_only_see_committed_actions(started_game):
+    """Tests that the readers get the last published snapshot, never an action half applied.
+    Fails if a change is visible before the commit or missing after it."""
+
+    store = loaded_store(started_game)
+    state = store.get(started_game)
+    published = store.snapshot(started_game)
+    seat = state.seat_at(0)
+    game_rules.draw_card(state, seat)
+    assert store.snapshot(started_game) is published
+    assert len(published.players[seat.id].hand) == 4
+
+    store.commit(state)
+    snapshot = store.snapshot(started_game)
+    assert snapshot.version == 1
+    assert len(snapshot.players[seat.id].hand) == 5
+    assert store.snapshot_by_player(seat.id) is snapshot
+
+@pytest.mark.state_test
+def test_role_counters_follow_the_game():
+    """Tests that the living players of each role are counted as roles change and players die.
+    Fails if a counter drifts from a full count or the winners do not follow them."""
+
+    game = dealt_game(4, seed=5)
+    assert (game.humans_alive, game.infected_alive, game.thing_alive) == (3, 0, 1)
+    assert not game_rules.is_game_over(game)
+    thing = next(seat for seat in game.seats() if seat.role == Role.THING)
+    humans = [seat for seat in game.seats() if seat.role == Role.HUMAN]
+
+    game.set_role(humans[0], Role.INFECTED)
+    card_actions.play_flamethrower(game, humans[1])
+    card_actions.play_flamethrower(game, humans[1])
+    assert (game.humans_alive, game.infected_alive, game.thing_alive) == (1, 1, 1)
+    assert game_rules.get_winners(game)["message"] == "Humans Win"
+
+    card_actions.play_flamethrower(game, humans[2])
+    assert game_rules.is_game_over(game)
+    winners = game_rules.get_winners(game)
+    assert winners["message"] == "The Thing and Infecteds Win"
+    assert sorted(p.id for p in winners["winners"]) == sorted([thing.id, humans[0].id])
+
+    game.count_roles()
+    assert (game.humans_alive, game.infected_alive, game.thing_alive) == (0, 1, 1)
+
+@pytest.mark.state_test
+def test_evicted_game_is_not_loaded_back():
+    """Tests that a read running when its game is evicted does not put the old state back in memory.
+    Fails if the state read before the eviction is registered or served, or the loads do not share the read."""
+
+    reads = []
+    #The game was read before it was torn down, and it is gone from the database afterwards
+    results = [dealt_game(4, seed=1), None]
+
+    async def loader(game_id):
+        reads.append(game_id)
+        result = results[len(reads) - 1]
+        await asyncio.sleep(0.01)
+        return result
+
+    store = GameStore(loader=loader)
+
+    async def run():
+        loads = [asyncio.create_task(store.load(1)) for _ in range(2)]
+        await asyncio.sleep(0)
+        store.evict(1)
+        return await asyncio.gather(*loads)
+
+    assert asyncio.run(run()) == [None, None]
+    assert reads == [1, 1]
+    assert store.get(1) is None and store.snapshot(1) is None and not store.reads
@@ -0,0 +1,41 @@
+import pytest
+from pony.orm import db_session
+from entities import Game
+from loaders import EntityLoader, query_count, db_game_2_game_state
+from test_fixture import started_game, create_db_game
+import utils
+
+@pytest.mark.loader_test
+def test_loader_query_count_is_constant():
+    """Tests that loading a game, its players and its host takes the same statements for any number of players.
+    Fails if it takes more than the game row and one statement for the players."""
+
+    counts = []
+    for num_of_players in (4, 12):
+        id_game = create_db_game(num_of_players)
+        with db_session:
+            start = query_count()
+            loader = EntityLoader(id_game)
+            game = loader.game()
+            for player in game.players:
+                assert loader.player(player.id) is player
+            assert loader.player(game.host.id) is game.host
+            db_game_2_game_state(game)
+            counts.append(query_count() - start)
+    #The game row and one statement for all of its players
+    assert counts == [2, 2]
+
+@pytest.mark.loader_test
+def test_game_data_sample_query_count_is_constant(started_game):
+    """Tests that the data of a game with its players and hands comes from a single statement.
+    Fails if it takes more than one statement or depends on the number of players."""
+
+    counts = []
+    for id_game in (started_game, create_db_game(12)):
+        with db_session:
+            game = Game[id_game]
+            start = query_count()
+            sample = utils.game_data_sample(game)
+            counts.append(query_count() - start)
+    assert counts[0] == counts[1] == 1
+    assert len(sample.players) == 12
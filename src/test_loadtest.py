@@ -0,0 +1,27 @@
+import asyncio
+import pytest
+from hello import app
+from loadtest import LoadTest, percentiles
+
+@pytest.mark.load_test
+def test_percentiles():
+    """Tests the percentiles of the load test report.
+    Fails if a percentile picks another sample or an empty list is not reported as None."""
+
+    assert percentiles([]) == {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    assert percentiles([i / 1000 for i in range(1, 101)]) == {"p50_ms": 51.0, "p95_ms": 96.0, "p99_ms": 100.0}
+
+@pytest.mark.load_test
+def test_load_test_plays_every_game():
+    """Tests that the load test plays every game against the app.
+    Fails if a request fails, a turn fails or no game message is measured."""
+
+    report = asyncio.run(LoadTest(app, games=2, clients=4, turns=12).run())
+    assert report["failed_turns"] == 0
+    endpoints = report["endpoints"]
+    assert endpoints["create_game"]["count"] == 2
+    assert endpoints["join_game"]["count"] == 6
+    assert endpoints["finish_game"]["count"] == 2
+    assert all(endpoint["errors"] == 0 for endpoint in endpoints.values())
+    assert report["broadcast"]["messages"] > 0
+    assert report["broadcast"]["lag"]["p50_ms"] is not None
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import pytest
+from lobby_index import LobbyIndex, LobbyBroadcaster
+from schemas import GameOut
+
+def game_out(id: int, name: str, number_of_players: int = 1, max_players: int = 6, password: str = "") -> GameOut:
+    return GameOut(id=id, name=name, min_players=4, max_players=max_players,
+                   password=password, number_of_players=number_of_players)
+
+@pytest.fixture
+def lobby():
+    index = LobbyIndex()
+    index.load([
+        game_out(1, "Alpha", password="secret"),
+        game_out(2, "Beta", number_of_players=5),
+        game_out(3, "alpine"),
+        game_out(4, "Gamma"),
+    ])
+    return index
+
+@pytest.mark.lobby_test
+def test_filters_and_pagination(lobby):
+    """Tests the pages and filters of the list of open games.
+    Fails if a page, a name prefix or a seat or password filter returns other games."""
+
+    assert [g.id for g in lobby.list_games()] == [1, 2, 3, 4]
+    assert [g.id for g in lobby.list_games(offset=1, limit=2)] == [2, 3]
+    assert [g.id for g in lobby.list_games(name_prefix="AL")] == [1, 3]
+    assert [g.id for g in lobby.list_games(no_password=True, free_seats=2)] == [3, 4]
+    assert [g.id for g in lobby.list_games(name_prefix="alp", no_password=True)] == [3]
+
+@pytest.mark.lobby_test
+def test_updates_bump_version(lobby):
+    """Tests that every change of the lobby bumps its version and goes in the next delta.
+    Fails if a full game stays, the version is off or the delta misses a change."""
+
+    version = lobby.version
+    lobby.update(game_out(2, "Beta", number_of_players=6))
+    assert 2 not in lobby.games
+    lobby.update(game_out(5, "Delta"))
+    lobby.remove(1)
+    assert [g.id for g in lobby.list_games()] == [3, 4, 5]
+    assert [g.id for g in lobby.list_games(name_prefix="al")] == [3]
+    assert lobby.version == version + 3
+    delta = lobby.take_delta()
+    assert delta["base"] == version and delta["version"] == lobby.version
+    assert [g["id"] for g in delta["added"]] == [5]
+    assert delta["changed"] == [] and delta["removed"] == [1, 2]
+
+@pytest.mark.lobby_test
+def test_started_game_leaves_the_lobby(lobby):
+    """Tests that a started game leaves the lobby once.
+    Fails if it stays listed or removing it again bumps the version."""
+
+    lobby.update(game_out(4, "Gamma", number_of_players=4), is_open=False)
+    assert 4 not in lobby.games
+    version = lobby.version
+    lobby.remove(4)
+    assert lobby.version == version
+
+class FakeManager:
+    def __init__(self):
+        self.sent = []
+
+    async def broadcast(self, group, message):
+        self.sent.append((group, json.loads(message)))
+
+@pytest.mark.lobby_test
+def test_deltas_are_coalesced(lobby):
+    """Tests that the changes of a window are sent to the menu as a single delta.
+    Fails if more than one delta is sent or it does not add up to the changes."""
+
+    manager = FakeManager()
+    broadcaster = LobbyBroadcaster(lobby, manager, window=0.01)
+    base = lobby.version
+
+    async def changes():
+        broadcaster.start()
+        lobby.update(game_out(5, "Delta"))
+        lobby.update(game_out(5, "Delta", number_of_players=2))
+        lobby.update(game_out(4, "Gamma", number_of_players=3))
+        lobby.remove(1)
+        lobby.update(game_out(6, "Epsilon"))
+        lobby.remove(6)
+        await asyncio.sleep(0.05)
+        await broadcaster.stop()
+
+    asyncio.run(changes())
+    assert len(manager.sent) == 1
+    group, delta = manager.sent[0]
+    assert group == 0
+    assert delta["base"] == base and delta["version"] == lobby.version
+    assert [g["id"] for g in delta["added"]] == [5]
+    assert delta["added"][0]["number_of_players"] == 2
+    assert [g["id"] for g in delta["changed"]] == [4]
+    assert delta["removed"] == [1]
+    assert lobby.take_delta() is None
@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from pony.orm import db_session
+from entities import Game
+from db_executor import DatabaseExecutor
+from outbox import Outbox
+from test_fixture import started_game
+
+class RecordingManager:
+    def __init__(self):
+        self.sent = []
+
+    async def broadcast(self, game_id, message):
+        #Effects only run after the commit, so a new session sees the change
+        with db_session:
+            self.sent.append((game_id, message, Game[game_id].current_turn))
+
+@pytest.mark.outbox_test
+def test_outbox_dispatches_after_commit(started_game):
+    """Tests that the effects of a transaction run after its commit and only if it committed.
+    Fails if a message is sent before the change is visible or a rolled back one is sent."""
+
+    database = DatabaseExecutor(max_workers=1)
+    manager = RecordingManager()
+
+    def turn(outbox, current_turn):
+        Game[started_game].current_turn = current_turn
+        outbox.broadcast(started_game, "turn")
+        if current_turn > 3:
+            raise ValueError()
+
+    async def run():
+        await database.transaction(turn, Outbox(manager), 2)
+        with pytest.raises(ValueError):
+            await database.transaction(turn, Outbox(manager), 5)
+
+    asyncio.run(run())
+    assert manager.sent == [(started_game, "turn", 2)]
+    database.shutdown()
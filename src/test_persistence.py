@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from pony.orm import db_session
+from entities import Game
+from persistence import WriteBehindPersister
+from loaders import db_game_2_game_state
+from db_executor import DatabaseExecutor
+from test_fixture import started_game, loaded_store
+import game_rules
+
+@pytest.mark.persistence_test
+def test_write_behind_persists_draw(started_game):
+    """Tests that a committed action is written to the database right away when the persister is not started.
+    Fails if the game is left dirty or the turn, hand or deck are not written."""
+
+    store = loaded_store(started_game)
+    persister = WriteBehindPersister(store)
+    state = store.get(started_game)
+    seat = state.seat_at(state.current_turn)
+    card = game_rules.draw_card(state, seat)
+    state.current_turn = 1
+    store.commit(state)
+
+    #Not started, the persister writes right away
+    assert not persister.dirty
+    with db_session:
+        reloaded = db_game_2_game_state(Game[started_game])
+    assert reloaded.current_turn == 1
+    assert card in reloaded.players[seat.id].hand
+    assert sorted(reloaded.deck) == sorted(state.deck)
+
+@pytest.mark.persistence_test
+def test_write_behind_in_executor(started_game):
+    """Tests that the dirty games are written in the database executor.
+    Fails if the game is still dirty after the flush or its turn was not written."""
+
+    store = loaded_store(started_game)
+    database = DatabaseExecutor(max_workers=2)
+    persister = WriteBehindPersister(store, database, delay=0)
+    state = store.get(started_game)
+
+    async def play():
+        persister.start()
+        game_rules.draw_card(state, state.seat_at(state.current_turn))
+        state.current_turn = 2
+        store.commit(state)
+        assert persister.dirty
+        await persister.flush_async(started_game)
+        await persister.stop()
+
+    asyncio.run(play())
+    assert not persister.dirty
+    with db_session:
+        assert Game[started_game].current_turn == 2
+    database.shutdown()
+
+@pytest.mark.persistence_test
+def test_stop_writes_the_dirty_games(started_game):
+    """Tests that stopping the persister cancels the scheduled write and writes the dirty games.
+    Fails if a game is left dirty or a write is still scheduled after it stopped."""
+
+    store = loaded_store(started_game)
+    database = DatabaseExecutor(max_workers=1)
+    persister = WriteBehindPersister(store, database, delay=60)
+    state = store.get(started_game)
+
+    async def play():
+        persister.start()
+        state.current_turn = 3
+        store.commit(state)
+        await persister.stop()
+        #Only this coroutine is left running
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(play())
+    assert not persister.dirty
+    with db_session:
+        assert Game[started_game].current_turn == 3
+    state.current_turn = 1
+    store.commit(state)
+    assert not persister.dirty
+    database.shutdown()
@@ -0,0 +1,80 @@
+import json
+import pytest
+from enumerations import CardName
+from test_fixture import dealt_game, card_named
+import game_rules
+import play_card as card_actions
+import state_diff
+
+@pytest.mark.seat_ring_test
+def test_seat_ring_navigation():
+    """Tests the neighbours, turns, barriers and lockdowns of the seat ring.
+    Fails if a dead seat is not skipped, the direction is ignored or a blocked neighbour is reachable."""
+
+    game = dealt_game(6, seed=3)
+    ring = game.seat_ring()
+    seats = list(game.seats())
+    assert ring.neighbours(seats[0]) == [seats[1], seats[5]]
+    assert ring.alive == 0b111111
+    assert game.seat_ring() is ring
+
+    seats[1].is_dead = True
+    game.seating_changed()
+    ring = game.seat_ring()
+    assert ring.neighbour(seats[0]) is seats[2]
+    assert ring.next_from(seats[1].position, clockwise=False) is seats[0]
+    game.current_turn = 0
+    assert game_rules.next_turn_player_name(game) == seats[2].name
+    game.going_clockwise = False
+    assert game_rules.change_turn(game) == seats[5].position
+
+    assert ring.alive == 0b111101
+    game.set_barriers(seats[2], left=True)
+    game.set_lockdown(seats[5], True)
+    assert ring.reachable(seats[0]) == []
+    assert ring.blocked(seats[2], seats[0])
+
+@pytest.mark.seat_ring_test
+def test_targets_come_from_the_ring():
+    """Tests that the targets of the action cards come from the masks of the ring.
+    Fails if a dead, blocked or locked down seat is a target when it should not be."""
+
+    game = dealt_game(5, seed=3)
+    seats = list(game.seats())
+    player = seats[0]
+    flamethrower, swap = card_named(game, CardName.FLAMETHROWER), card_named(game, CardName.SWAP_PLACES)
+    player.hand.extend((flamethrower, swap))
+    seats[4].is_dead = True
+    game.seating_changed()
+    game.set_barriers(seats[1], right=True)
+    assert card_actions.targeted_players(game, flamethrower, player) == [seats[1], seats[3]]
+    game.set_lockdown(seats[3], True)
+    assert card_actions.targeted_players(game, swap, player) == [seats[1]]
+    game.set_barriers(seats[1], left=True)
+    assert card_actions.targeted_players(game, swap, player) == []
+    axe = card_named(game, CardName.AXE)
+    player.hand.append(axe)
+    assert card_actions.targeted_players(game, axe, player) == [seats[1], seats[3]]
+
+@pytest.mark.seat_ring_test
+def test_flamethrower_keeps_the_seating():
+    """Tests that a burnt player keeps its seat and is skipped by the turns.
+    Fails if a position changes, the ring is rebuilt or the delta sends positions."""
+
+    game = dealt_game(5, seed=3)
+    seats = list(game.seats())
+    positions = {seat.id: seat.position for seat in seats}
+    ring = game.seat_ring()
+    state_diff.reset_view(game)
+    game.current_turn = 1
+    card_actions.play_flamethrower(game, seats[2])
+    game.version += 1
+
+    assert {seat.id: seat.position for seat in game.players.values()} == positions
+    assert game.seat_ring() is ring and len(ring) == 4
+    assert game_rules.change_turn(game) == 3
+    assert game.seat_at(2) is seats[2]
+    delta = json.loads(state_diff.game_state_2_delta_json(game))
+    assert delta["game"] == {"current_turn": 3}
+    assert delta["players"][str(seats[2].id)]["is_dead"] is True
+    assert "position" not in delta["players"][str(seats[2].id)]
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import pytest
+import simulator
+
+@pytest.mark.simulation_test
+@pytest.mark.parametrize("agent", sorted(simulator.AGENTS))
+def test_simulated_games_are_reproducible(agent):
+    """Tests that a simulated game is reproducible from its seed and ends.
+    Fails if two runs of a seed differ or a game is unfinished."""
+
+    first = [simulator.simulate_game(seed, 6, agent) for seed in range(20)]
+    assert first == [simulator.simulate_game(seed, 6, agent) for seed in range(20)]
+    assert all(result["outcome"] != "unfinished" for result in first)
+
+@pytest.mark.simulation_test
+def test_turns_keep_the_cards():
+    """Tests that the simulated turns never lose or create cards.
+    Fails if the cards do not add up or a living player does not end with four."""
+
+    game = simulator.new_game(5, seed=11)
+    agents = {player_id: simulator.RandomAgent(game.rng) for player_id in game.players}
+    total = len(game.manifest)
+    while not game.is_over():
+        simulator.play_turn(game, agents)
+        hands = [seat.hand for seat in game.players.values()]
+        assert len(game.deck) + len(game.discarded) + sum(len(h) for h in hands) == total
+        assert all(len(seat.hand) == 4 for seat in game.players.values() if not seat.is_dead)
+
+@pytest.mark.simulation_test
+def test_run_simulations_report():
+    """Tests the report of a batch of simulations.
+    Fails if a game is missing from the outcomes or the throughput is not measured."""
+
+    report = simulator.run_simulations(30, num_of_players=4, workers=1, chunk=8)
+    assert report["games"] == 30
+    assert sum(report["outcomes"].values()) == 30
+    assert report["actions_per_second"] > 0
+
+@pytest.mark.simulation_test
+def test_simulator_does_not_touch_the_database(tmp_path):
+    """Tests that the simulator runs without importing the entities.
+    Fails if entities is imported or a file is created in the working directory."""
+
+    code = "import sys, simulator; simulator.simulate_game(1, 4); assert 'entities' not in sys.modules"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(simulator.__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, check=True)
+    assert not list(tmp_path.iterdir())
+
+@pytest.mark.simulation_test
+def test_agents_must_choose_every_move():
+    """Tests that an agent must implement every choice.
+    Fails if an agent missing a choice can be built."""
+
+    class Lazy(simulator.Agent):
+        def choose_play(self, game, seat, plays):
+            return None
+
+    with pytest.raises(TypeError):
+        Lazy(None)
@@ -0,0 +1,25 @@
+import json
+import pytest
+from test_fixture import started_game, loaded_store
+import game_rules
+import state_diff
+
+@pytest.mark.delta_test
+def test_delta_contains_only_changes(started_game):
+    """Tests that a delta carries only the fields and cards that changed since its base.
+    Fails if an unchanged field is sent, a change is missing or the staleness check is wrong."""
+
+    store = loaded_store(started_game)
+    state = store.get(started_game)
+    state_diff.reset_view(state)
+    seat = state.seat_at(0)
+    card = game_rules.draw_card(state, seat)
+    state.current_turn = 1
+    store.commit(state)
+
+    delta = json.loads(state_diff.game_state_2_delta_json(state))
+    assert delta["base"] == 0 and delta["version"] == 1
+    assert delta["game"] == {"current_turn": 1}
+    assert list(delta["players"]) == [str(seat.id)]
+    assert delta["players"][str(seat.id)]["card_added"] == [[card, state.card(card).name]]
+    assert state_diff.is_stale(state, 0) and not state_diff.is_stale(state, 1)
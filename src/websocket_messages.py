@@ -1,4 +1,5 @@
 import json
+from functools import lru_cache
 from pydantic import BaseModel
 from enumerations import Event
 
@@ -44,35 +45,37 @@ class InGameMessages(BaseMessages):
     def discard(self):
         return f"{self.player_name} discarded a card"
     
-    def start_message(self):
-        return f"game {self.game_name} started"
-    
-    def host_leave(self):
+    @staticmethod
+    def host_leave():
         return f"game cancel, host left the game"
     
 
+def connection_message(token: str) -> str:
+    """First message of a connection, the token routes it when creating or joining a game"""
+    return json.dumps({"event": "connection", "token": token})
+
+@lru_cache(maxsize=4096)
+def game_event(event: Event, player_name: str) -> str:
+    """Serialized game event, the same payload is reused by every broadcast of it"""
+    return json.dumps({"event": event.value, "player_name": player_name})
+
 class GameEvents(BaseMessages):
     player_name: str
     player_target: str | None = None
     card: str | None = None
-    event: Event
+    event: Event | None = None
 
     def draw_card(self):
-        envent_type = "draw_card"
-        return json.dumps({"event": envent_type, "player_name": self.player_name})
+        return game_event(Event.DRAW, self.player_name)
     
     def play_card(self):
-        envent_type = "play_card"
-        return json.dumps({"event": envent_type, "player_name": self.player_name})
+        return game_event(Event.PLAY_CARD, self.player_name)
     
     def exchange_card(self):
-        envent_type = "exchange_card"
-        return json.dumps({"event": envent_type, "player_name": self.player_name})
+        return game_event(Event.EXCHANGE, self.player_name)
     
     def invite_exchange(self):
-        envent_type = "invite_exchange"
-        return json.dumps({"event": envent_type, "player_name": self.player_name})
+        return game_event(Event.EXCHANGE_INVITATION, self.player_name)
     
     def wait(self):
-        envent_type = "wait"
-        return json.dumps({"event": envent_type, "player_name": self.player_name})
\ No newline at end of file
+        return game_event(Event.WAIT, self.player_name)